@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+ADMITTED = "admitted"
+QUEUED = "queued"
+REJECTED = "rejected"
+
+ADMISSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    event_id INTEGER NOT NULL,
+    token TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (event_id, token)
+);
+CREATE INDEX IF NOT EXISTS idx_slots_expiry ON slots (expires_at);
+CREATE TABLE IF NOT EXISTS queue (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    token TEXT NOT NULL,
+    joined_at REAL NOT NULL,
+    seen_at REAL NOT NULL,
+    UNIQUE (event_id, token)
+);
+CREATE INDEX IF NOT EXISTS idx_queue_event ON queue (event_id, seq);
+CREATE INDEX IF NOT EXISTS idx_queue_seen ON queue (seen_at);
+CREATE INDEX IF NOT EXISTS idx_queue_joined ON queue (joined_at);
+"""
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        db_path: Path,
+        max_active: int,
+        max_queue: int,
+        max_wait_seconds: int,
+        slot_seconds: int,
+        poll_seconds: int,
+    ) -> None:
+        self.db_path = db_path
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.slot_seconds = slot_seconds
+        self.poll_seconds = poll_seconds
+        self._local = threading.local()
+        self._connect().executescript(ADMISSION_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expire(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM slots WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM queue WHERE seen_at < ? OR joined_at <= ?",
+            (now - 3 * self.poll_seconds, now - self.max_wait_seconds),
+        )
+
+    def _count(self, conn: sqlite3.Connection, table: str, event_id: int) -> int:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE event_id = ?", (event_id,)).fetchone()[0]
+
+    def _promote(self, conn: sqlite3.Connection, event_id: int, now: float) -> None:
+        free = self.max_active - self._count(conn, "slots", event_id)
+        if free <= 0:
+            return
+        rows = conn.execute(
+            "SELECT seq, token FROM queue WHERE event_id = ? ORDER BY seq LIMIT ?", (event_id, free)
+        ).fetchall()
+        for seq, token in rows:
+            conn.execute("DELETE FROM queue WHERE seq = ?", (seq,))
+            conn.execute(
+                "INSERT INTO slots (event_id, token, expires_at) VALUES (?, ?, ?)",
+                (event_id, token, now + self.slot_seconds),
+            )
+
+    def _admit(self, conn: sqlite3.Connection, event_id: int, token: str, now: float) -> Tuple[str, int]:
+        self._expire(conn, now)
+
+        if conn.execute(
+            "UPDATE slots SET expires_at = ? WHERE event_id = ? AND token = ?",
+            (now + self.slot_seconds, event_id, token),
+        ).rowcount:
+            return ADMITTED, 0
+
+        row = conn.execute("SELECT seq FROM queue WHERE event_id = ? AND token = ?", (event_id, token)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE queue SET seen_at = ? WHERE seq = ?", (now, row[0]))
+        else:
+            queued = self._count(conn, "queue", event_id)
+            if self._count(conn, "slots", event_id) < self.max_active and not queued:
+                conn.execute(
+                    "INSERT INTO slots (event_id, token, expires_at) VALUES (?, ?, ?)",
+                    (event_id, token, now + self.slot_seconds),
+                )
+                return ADMITTED, 0
+            if queued >= self.max_queue:
+                return REJECTED, 0
+            conn.execute(
+                "INSERT INTO queue (event_id, token, joined_at, seen_at) VALUES (?, ?, ?, ?)",
+                (event_id, token, now, now),
+            )
+
+        self._promote(conn, event_id, now)
+        row = conn.execute("SELECT seq FROM queue WHERE event_id = ? AND token = ?", (event_id, token)).fetchone()
+        if row is None:
+            return ADMITTED, 0
+        position = conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE event_id = ? AND seq <= ?", (event_id, row[0])
+        ).fetchone()[0]
+        return QUEUED, position
+
+    def admit(self, event_id: int, token: str) -> Tuple[str, int]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = self._admit(conn, event_id, token, time.time())
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def release(self, event_id: int, token: str) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slots WHERE event_id = ? AND token = ?", (event_id, token))
+            conn.execute("DELETE FROM queue WHERE event_id = ? AND token = ?", (event_id, token))
+            self._promote(conn, event_id, time.time())
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def stats(self, event_id: int) -> Dict[str, int]:
+        conn = self._connect()
+        now = time.time()
+        active = conn.execute(
+            "SELECT COUNT(*) FROM slots WHERE event_id = ? AND expires_at > ?", (event_id, now)
+        ).fetchone()[0]
+        queued = conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE event_id = ? AND seen_at >= ? AND joined_at > ?",
+            (event_id, now - 3 * self.poll_seconds, now - self.max_wait_seconds),
+        ).fetchone()[0]
+        return {"active": active, "queued": queued}
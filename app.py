@@ -1,20 +1,49 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import wraps
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import List, Optional
+import atexit
+import gzip
+import hashlib
+import heapq
 import json
+import math
+import os
+import uuid
+
+from flask import (
+    Flask,
+    abort,
+    g,
+    get_template_attribute,
+    has_app_context,
+    redirect,
+    render_template,
+    request,
+    session,
+    url_for,
+)
 
-from flask import Flask, abort, redirect, render_template, request, session, url_for
-
+from admission import ADMITTED, REJECTED, AdmissionController
 from auth_validation import (
     validate_login_form,
     validate_profile_form,
     validate_register_form,
 )
-from encryption import decrypt_aes, encrypt_aes, hash_password, verify_password
+from catalog import SORT_OPTIONS, Event, EventCatalog
+from encryption import decrypt_aes, encrypt_aes
+from fragment_cache import FragmentCache
+from inventory import Inventory
+from login_attempts import LoginAttemptTracker
+from migrations import LATEST_VERSION, pending_migrations, schema_version
+from password_cost import load_policy, needs_rehash
+from password_pool import PasswordPool, PasswordPoolBusy
+from search import tokenize
+from storage import open_storage
+from user_store import normalize_email
 from validation import validate_payment_form
 
 app = Flask(__name__)
@@ -26,30 +55,88 @@ DATA_DIR = BASE_DIR / "data"
 EVENTS_PATH = DATA_DIR / "events.json"
 USERS_PATH = DATA_DIR / "users.json"
 ORDERS_PATH = DATA_DIR / "orders.json"
+ORDERS_COMPACT_EVERY = 1000
+USERS_FLUSH_DELAY_SECONDS = float(os.environ.get("EVENTHUB_USERS_FLUSH_DELAY", 1.0))
+STORAGE_BACKEND = os.environ.get("EVENTHUB_STORAGE", "json")
+SQLITE_PATH = Path(os.environ.get("EVENTHUB_SQLITE_PATH", DATA_DIR / "eventhub.db"))
+INVENTORY_PATH = DATA_DIR / "inventory.db"
+CATALOG_SNAPSHOT_PATH = DATA_DIR / "catalog.snap"
+TICKET_HOLD_SECONDS = 600
+CHECKOUT_MAX_ACTIVE = 50
+CHECKOUT_QUEUE_DEPTH = 2000
+CHECKOUT_QUEUE_WAIT_SECONDS = 900
+CHECKOUT_QUEUE_POLL_SECONDS = 5
+CHECKOUT_ADMISSION_PATH = DATA_DIR / "admission.db"
 
 CATEGORIES = ["All", "Music", "Tech", "Sports", "Business"]
 CITIES = ["Any", "New York", "San Francisco", "Berlin", "London", "Oakland", "San Jose"]
+RANGE_ARGS = ("date_from", "date_to", "min_price", "max_price", "only_available", "sort")
+
+UPCOMING_PAGE_SIZE = 6
+DASHBOARD_PAGE_SIZE = 20
+ADMIN_USERS_PAGE_SIZE = 25
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+GZIP_MIN_BYTES = 1024
+FRAGMENT_CACHE_MAX_BYTES = 8 * 1024 * 1024
+SIMILAR_EVENTS_LIMIT = 5
+EVENT_API_FIELDS = (
+    "id",
+    "title",
+    "category",
+    "city",
+    "venue",
+    "start",
+    "end",
+    "price_usd",
+    "available_tickets",
+    "banner_url",
+    "description",
+)
 
 MAX_FAILED_ATTEMPTS = 3
 LOCKOUT_SECONDS = 30
 SESSION_TIMEOUT_SECONDS = 180
-LOGIN_ATTEMPTS: Dict[str, Dict[str, int | float]] = {}
+LOGIN_ATTEMPT_WINDOW_SECONDS = 900
+LOGIN_TRACKER_MAX_ENTRIES = 100_000
+LOGIN_TRACKER_PATH = DATA_DIR / "login_attempts.db"
 AES_KEY = b"eventhub-lab-key"
-
-
-@dataclass(frozen=True)
-class Event:
-    id: int
-    title: str
-    category: str
-    city: str
-    venue: str
-    start: datetime
-    end: datetime
-    price_usd: float
-    available_tickets: int
-    banner_url: str
-    description: str
+BULK_CRYPTO_WORKERS = min(8, os.cpu_count() or 1)
+BULK_CRYPTO_MIN_PARALLEL = 256
+PASSWORD_POOL_WORKERS = int(os.environ.get("EVENTHUB_PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_POOL_QUEUE = int(os.environ.get("EVENTHUB_PASSWORD_QUEUE", 32))
+PASSWORD_POOL_TIMEOUT_SECONDS = 5.0
+PASSWORD_POLICY_PATH = DATA_DIR / "password_policy.json"
+PASSWORD_BUSY_MESSAGE = "We're handling a lot of sign-ins right now. Please try again in a moment."
+
+STORAGE = open_storage(
+    STORAGE_BACKEND,
+    DATA_DIR,
+    SQLITE_PATH,
+    compact_every=ORDERS_COMPACT_EVERY,
+    users_flush_delay=USERS_FLUSH_DELAY_SECONDS,
+)
+atexit.register(STORAGE.flush)
+EVENT_CATALOG = EventCatalog(STORAGE, snapshot_path=CATALOG_SNAPSHOT_PATH)
+FRAGMENT_CACHE = FragmentCache(FRAGMENT_CACHE_MAX_BYTES)
+INVENTORY = Inventory(INVENTORY_PATH, hold_seconds=TICKET_HOLD_SECONDS)
+PASSWORD_POOL = PasswordPool(PASSWORD_POOL_WORKERS, PASSWORD_POOL_QUEUE, PASSWORD_POOL_TIMEOUT_SECONDS)
+PASSWORD_POLICY = load_policy(PASSWORD_POLICY_PATH)
+LOGIN_TRACKER = LoginAttemptTracker(
+    LOGIN_TRACKER_PATH,
+    max_attempts=MAX_FAILED_ATTEMPTS,
+    window_seconds=LOGIN_ATTEMPT_WINDOW_SECONDS,
+    lockout_seconds=LOCKOUT_SECONDS,
+    max_entries=LOGIN_TRACKER_MAX_ENTRIES,
+)
+CHECKOUT_ADMISSION = AdmissionController(
+    CHECKOUT_ADMISSION_PATH,
+    max_active=CHECKOUT_MAX_ACTIVE,
+    max_queue=CHECKOUT_QUEUE_DEPTH,
+    max_wait_seconds=CHECKOUT_QUEUE_WAIT_SECONDS,
+    slot_seconds=TICKET_HOLD_SECONDS,
+    poll_seconds=CHECKOUT_QUEUE_POLL_SECONDS,
+)
 
 
 def ensure_data_files() -> None:
@@ -81,62 +168,31 @@ def _now_utc() -> datetime:
 
 
 def _is_locked(user: dict) -> tuple[bool, int]:
-    locked_until = _parse_iso_datetime(user.get("locked_until"))
-    if not locked_until:
-        return False, 0
-    remaining = int((locked_until - _now_utc()).total_seconds())
+    remaining = LOGIN_TRACKER.lock_remaining(user.get("email") or "")
     if remaining <= 0:
         return False, 0
     return True, remaining
 
 
 def _clear_lock_for_user(email: str) -> None:
-    email_norm = (email or "").strip().lower()
-    LOGIN_ATTEMPTS[email_norm] = {"attempts": 0, "lockout_until": 0}
-
-    users = load_users()
-    changed = False
-    for u in users:
-        if (u.get("email") or "").strip().lower() == email_norm:
-            if u.get("locked_until"):
-                u["locked_until"] = ""
-                changed = True
-            break
-    if changed:
-        save_users(users)
+    LOGIN_TRACKER.clear(email)
 
 
 def _register_failed_login(email: str) -> tuple[int, bool]:
-    email_norm = (email or "").strip().lower()
-    state = LOGIN_ATTEMPTS.setdefault(email_norm, {"attempts": 0, "lockout_until": 0})
-    state["attempts"] = int(state.get("attempts", 0)) + 1
-
-    users = load_users()
-    lock_applied = False
-    if state["attempts"] >= MAX_FAILED_ATTEMPTS:
-        lockout_until = _now_utc() + timedelta(seconds=LOCKOUT_SECONDS)
-        state["lockout_until"] = int(lockout_until.timestamp())
-        for u in users:
-            if (u.get("email") or "").strip().lower() == email_norm:
-                u["locked_until"] = lockout_until.isoformat()
-                lock_applied = True
-                break
-        save_users(users)
-    return int(state["attempts"]), lock_applied
+    return LOGIN_TRACKER.record_failure(email)
+
+
+def _decrypt_field(data: dict) -> str:
+    try:
+        return decrypt_aes(data["ciphertext"], data["nonce"], data["tag"], AES_KEY)
+    except Exception:
+        return ""
 
 
 def _decrypt_phone(user: dict) -> str:
     phone_data = user.get("phone_encrypted")
     if isinstance(phone_data, dict):
-        try:
-            return decrypt_aes(
-                phone_data["ciphertext"],
-                phone_data["nonce"],
-                phone_data["tag"],
-                AES_KEY,
-            )
-        except Exception:
-            return ""
+        return _decrypt_field(phone_data)
     return (user.get("phone") or "").strip()
 
 
@@ -145,69 +201,51 @@ def _encrypt_field(value: str) -> dict:
     return {"ciphertext": ciphertext, "nonce": nonce, "tag": tag}
 
 
-def _verify_user_password(user: dict, password: str) -> bool:
-    if isinstance(user.get("password_data"), dict):
-        return verify_password(password, user["password_data"])
+def _map_bulk(func, items: list, workers: int) -> list:
+    if workers <= 1 or len(items) < BULK_CRYPTO_MIN_PARALLEL:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items))
 
-    legacy_password = user.get("password")
-    if legacy_password and legacy_password == password:
-        users = load_users()
-        email_norm = (user.get("email") or "").strip().lower()
-        for u in users:
-            if (u.get("email") or "").strip().lower() == email_norm:
-                u.pop("password", None)
-                u["password_data"] = hash_password(password)
-                save_users(users)
-                break
-        return True
-    return False
+
+def _encrypt_fields(values: List[str], workers: int = 1) -> List[dict]:
+    return _map_bulk(_encrypt_field, list(values), workers)
+
+
+def _decrypt_fields(fields: List[dict], workers: int = 1) -> List[str]:
+    return _map_bulk(_decrypt_field, list(fields), workers)
 
 
-def _migrate_old_orders() -> None:
-    orders = load_orders()
-    changed = False
-    for order in orders:
-        payment = order.get("payment") or {}
-        if not isinstance(payment, dict):
-            continue
+def _decrypt_phones(users: List[dict], workers: int = 1) -> List[str]:
+    encrypted = [u for u in users if isinstance(u.get("phone_encrypted"), dict)]
+    phones = iter(_decrypt_fields([u["phone_encrypted"] for u in encrypted], workers))
+    return [next(phones) if isinstance(u.get("phone_encrypted"), dict) else (u.get("phone") or "").strip() for u in users]
 
-        payment.pop("cvv", None)
-        payment.pop("card_number", None)
 
-        if "card" in payment and payment.get("card"):
-            card = payment.pop("card")
-            last4 = str(card)[-4:]
-            payment["card_masked"] = f"**** **** **** {last4}"
-            changed = True
+def hash_user_password(password: str) -> dict:
+    return PASSWORD_POOL.hash(password, int(PASSWORD_POLICY["iterations"]))
 
-        if "billing_email" in payment and payment.get("billing_email") and not payment.get("billing_email_encrypted"):
-            payment["billing_email_encrypted"] = _encrypt_field(payment.pop("billing_email"))
-            changed = True
 
-        order["payment"] = payment
-    if changed:
-        save_orders(orders)
+def _verify_user_password(user: dict, password: str) -> bool:
+    if isinstance(user.get("password_data"), dict):
+        if not PASSWORD_POOL.verify(password, user["password_data"]):
+            return False
+        if needs_rehash(user["password_data"], PASSWORD_POLICY):
+            try:
+                update_user(user.get("email") or "", {"password_data": hash_user_password(password)})
+            except PasswordPoolBusy:
+                pass
+        return True
+
+    legacy_password = user.get("password")
+    if legacy_password and legacy_password == password:
+        update_user(user.get("email") or "", {"password_data": hash_user_password(password)}, remove=("password",))
+        return True
+    return False
 
 
 def load_events() -> List[Event]:
-    ensure_data_files()
-    data = json.loads(EVENTS_PATH.read_text(encoding="utf-8"))
-    return [
-        Event(
-            id=int(e["id"]),
-            title=e["title"],
-            category=e["category"],
-            city=e["city"],
-            venue=e["venue"],
-            start=datetime.fromisoformat(e["start"]),
-            end=datetime.fromisoformat(e["end"]),
-            price_usd=float(e["price_usd"]),
-            available_tickets=int(e["available_tickets"]),
-            banner_url=e.get("banner_url", ""),
-            description=e.get("description", ""),
-        )
-        for e in data
-    ]
+    return EVENT_CATALOG.all()
 
 
 def _parse_date(date_str: str) -> Optional[datetime]:
@@ -227,50 +265,260 @@ def _safe_int(value: str, default: int = 1, min_v: int = 1, max_v: int = 10) ->
     return max(min_v, min(max_v, n))
 
 
-def filter_events(q: str = "", city: str = "Any", date: Optional[datetime] = None, category: str = "All") -> List[Event]:
-    q_norm = (q or "").strip().lower()
+def _parse_price(value: str) -> Optional[float]:
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) and price >= 0 else None
+
+
+def _parse_flag(value: str) -> bool:
+    return (value or "").strip().lower() in ("1", "true", "on", "yes")
+
+
+def _listing_filters(args) -> dict:
+    sort = args.get("sort", "date")
+    return {
+        "q": args.get("q", ""),
+        "city": args.get("city", "Any"),
+        "date": _parse_date(args.get("date", "")),
+        "category": args.get("category", "All"),
+        "date_from": _parse_date(args.get("date_from", "")),
+        "date_to": _parse_date(args.get("date_to", "")),
+        "min_price": _parse_price(args.get("min_price", "")),
+        "max_price": _parse_price(args.get("max_price", "")),
+        "only_available": _parse_flag(args.get("only_available", "")),
+        "sort": sort if sort in SORT_OPTIONS else "date",
+    }
+
+
+def _sold_out_ids() -> frozenset:
+    if has_app_context() and "sold_out_ids" in g:
+        return g.sold_out_ids
+    sold_out = set()
+    for event_id, taken in INVENTORY.committed().items():
+        event = EVENT_CATALOG.get(event_id)
+        if event is not None and taken >= event.available_tickets:
+            sold_out.add(event_id)
+    result = frozenset(sold_out)
+    if has_app_context():
+        g.sold_out_ids = result
+    return result
+
+
+def _catalog_filters(
+    q: str,
+    city: str,
+    date: Optional[datetime],
+    category: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    only_available: bool = False,
+    sort: str = "date",
+) -> dict:
     city_norm = (city or "Any").strip()
     category_norm = (category or "All").strip()
+    return {
+        "category": None if category_norm == "All" else category_norm,
+        "city": None if city_norm == "Any" else city_norm,
+        "day": date.date() if date else None,
+        "text": q or "",
+        "start_from": date_from,
+        "start_to": date_to + timedelta(days=1) if date_to else None,
+        "min_price": min_price,
+        "max_price": max_price,
+        "only_available": only_available,
+        "exclude_ids": _sold_out_ids() if only_available else frozenset(),
+        "sort": sort,
+    }
+
 
-    results = load_events()
+def filter_events(
+    q: str = "",
+    city: str = "Any",
+    date: Optional[datetime] = None,
+    category: str = "All",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: str = "",
+    **ranges,
+) -> List[Event]:
+    return EVENT_CATALOG.query(
+        **_catalog_filters(q, city, date, category, **ranges),
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+    )
+
+
+def page_events(
+    limit: int,
+    q: str = "",
+    city: str = "Any",
+    date: Optional[datetime] = None,
+    category: str = "All",
+    cursor: str = "",
+    **ranges,
+) -> tuple[List[Event], str, int]:
+    return EVENT_CATALOG.page(limit, **_catalog_filters(q, city, date, category, **ranges), cursor=cursor)
+
+
+def _event_to_dict(event: Event, fields: List[str]) -> dict:
+    data = {}
+    for field in fields:
+        value = getattr(event, field)
+        data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _json_response(payload: dict, status: int = 200):
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    response = app.response_class(body, status=status, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.accept_encodings:
+        response.set_data(gzip.compress(body))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def _catalog_etag(*parts) -> Optional[str]:
+    if session.get("user_email"):
+        return None
+    EVENT_CATALOG.refresh()
+    raw = "|".join(str(p) for p in (EVENT_CATALOG.revision, request.full_path, *parts))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _with_cache_validators(response, etag: Optional[str], last_modified: Optional[datetime] = None):
+    response.vary.add("Cookie")
+    if etag is None:
+        return response
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _not_modified(etag: Optional[str], last_modified: Optional[datetime] = None):
+    if etag is None:
+        return None
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    else:
+        fresh = bool(last_modified and request.if_modified_since and request.if_modified_since >= last_modified)
+    if not fresh:
+        return None
+    return _with_cache_validators(app.response_class(status=304), etag, last_modified)
 
-    if category_norm != "All":
-        results = [e for e in results if e.category == category_norm]
-    if city_norm != "Any":
-        results = [e for e in results if e.city == city_norm]
-    if date:
-        results = [e for e in results if e.start.date() == date.date()]
-    if q_norm:
-        results = [e for e in results if q_norm in e.title.lower() or q_norm in e.venue.lower()]
 
-    results.sort(key=lambda e: e.start)
-    return results
+def _filter_key(filters: dict) -> tuple:
+    key = [" ".join(tokenize(filters["q"]))]
+    for name in ("city", "date", "category", "date_from", "date_to", "min_price", "max_price", "sort"):
+        value = filters[name]
+        key.append(value.date().isoformat() if isinstance(value, datetime) else value)
+    key.append(_sold_out_ids() if filters["only_available"] else None)
+    return tuple(key)
+
+
+def _cached_cards(macro: str, version: int, key: tuple, events) -> str:
+    return FRAGMENT_CACHE.get_or_render(
+        (macro, version) + key,
+        lambda: get_template_attribute("event_cards.html", macro)(events()),
+    )
+
+
+def _similar_cards(event: Event) -> str:
+    return _cached_cards(
+        "similar_cards",
+        event.catalog_version,
+        (event.id,),
+        lambda: EVENT_CATALOG.similar(event, SIMILAR_EVENTS_LIMIT),
+    )
 
 
 def get_event_or_404(event_id: int) -> Event:
-    for e in load_events():
-        if e.id == event_id:
-            return e
-    abort(404)
+    event = EVENT_CATALOG.get(event_id)
+    if event is None:
+        abort(404)
+    return event
+
+
+def tickets_left(event: Event) -> int:
+    return INVENTORY.available(event.id, event.available_tickets)
+
+
+def _admission_token() -> str:
+    token = session.get("admission_token")
+    if not token:
+        token = uuid.uuid4().hex
+        session["admission_token"] = token
+    return token
+
+
+def _waiting_room(event: Event, qty: int, status: str, position: int):
+    response = app.make_response((
+        render_template(
+            "waiting_room.html",
+            event=event,
+            qty=qty,
+            position=position,
+            rejected=status == REJECTED,
+            poll_seconds=CHECKOUT_QUEUE_POLL_SECONDS,
+        ),
+        503 if status == REJECTED else 202,
+    ))
+    response.headers["Retry-After"] = str(CHECKOUT_QUEUE_POLL_SECONDS)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def _checkout_hold(event: Event, qty: int) -> Optional[dict]:
+    hold = session.get("checkout_hold")
+    if hold and hold.get("event_id") == event.id and hold.get("qty") == qty and INVENTORY.is_active(hold["id"]):
+        return hold
+    if hold:
+        INVENTORY.release(hold["id"])
+        session.pop("checkout_hold", None)
+
+    hold_id = INVENTORY.reserve(event.id, event.available_tickets, qty, owner=session.get("user_email", ""))
+    if hold_id is None:
+        return None
+    hold = {"id": hold_id, "event_id": event.id, "qty": qty}
+    session["checkout_hold"] = hold
+    return hold
 
 
 def load_users() -> list[dict]:
     ensure_data_files()
-    return json.loads(USERS_PATH.read_text(encoding="utf-8"))
+    return STORAGE.load_users()
+
+
+def _forget_current_user() -> None:
+    if has_app_context():
+        g.pop("current_user_cache", None)
 
 
 def save_users(users: list[dict]) -> None:
     ensure_data_files()
-    USERS_PATH.write_text(json.dumps(users, indent=2), encoding="utf-8")
+    STORAGE.save_users(users)
+    _forget_current_user()
+
+
+def update_user(email: str, changes: dict, remove: tuple[str, ...] = ()) -> Optional[dict]:
+    ensure_data_files()
+    updated = STORAGE.update_user(email, changes, remove)
+    _forget_current_user()
+    return updated
 
 
 def find_user_by_email(email: str) -> Optional[dict]:
-    users = load_users()
-    email_norm = (email or "").strip().lower()
-    for u in users:
-        if (u.get("email", "") or "").strip().lower() == email_norm:
-            return _user_with_defaults(u)
-    return None
+    user = STORAGE.find_user_by_email(email)
+    return _user_with_defaults(user) if user else None
 
 
 def user_exists(email: str) -> bool:
@@ -279,23 +527,29 @@ def user_exists(email: str) -> bool:
 
 def load_orders() -> list[dict]:
     ensure_data_files()
-    return json.loads(ORDERS_PATH.read_text(encoding="utf-8"))
+    return STORAGE.load_orders()
 
 
 def save_orders(orders: list[dict]) -> None:
     ensure_data_files()
-    ORDERS_PATH.write_text(json.dumps(orders, indent=2), encoding="utf-8")
+    STORAGE.save_orders(orders)
 
 
-def next_order_id(orders: list[dict]) -> int:
-    return max([o.get("id", 0) for o in orders], default=0) + 1
+def append_order(order: dict) -> dict:
+    ensure_data_files()
+    return STORAGE.append_order(order)
 
 
 def get_current_user() -> Optional[dict]:
     email = session.get("user_email")
     if not email:
         return None
-    return find_user_by_email(email)
+    cached = g.get("current_user_cache")
+    if cached is not None and cached[0] == email:
+        return cached[1]
+    user = find_user_by_email(email)
+    g.current_user_cache = (email, user)
+    return user
 
 
 def _is_session_expired() -> bool:
@@ -344,32 +598,83 @@ def inject_nav_context():
 
 @app.get("/")
 def index():
-    q = request.args.get("q", "")
-    city = request.args.get("city", "Any")
-    date_str = request.args.get("date", "")
-    category = request.args.get("category", "All")
+    only_available = _parse_flag(request.args.get("only_available", ""))
+    etag = _catalog_etag(*sorted(_sold_out_ids()) if only_available else ())
+    last_modified = EVENT_CATALOG.modified_at if etag and not only_available else None
+    not_modified = _not_modified(etag, last_modified)
+    if not_modified is not None:
+        return not_modified
 
-    date = _parse_date(date_str)
-    events = filter_events(q=q, city=city, date=date, category=category)
+    filters = _listing_filters(request.args)
+    cursor = request.args.get("cursor", "")
 
-    return render_template(
+    try:
+        upcoming, next_cursor, version = page_events(UPCOMING_PAGE_SIZE, cursor=cursor, **filters)
+    except ValueError:
+        cursor = ""
+        upcoming, next_cursor, version = page_events(UPCOMING_PAGE_SIZE, **filters)
+    featured, featured_version = upcoming[:3], version
+    if cursor:
+        featured, _, featured_version = page_events(3, **filters)
+    cache_key = _filter_key(filters)
+    featured_cards = _cached_cards("featured_cards", featured_version, cache_key, lambda: featured)
+    upcoming_cards = _cached_cards("upcoming_cards", version, cache_key + (cursor,), lambda: upcoming)
+
+    response = app.make_response(render_template(
         "index.html",
-        q=q,
-        city=city,
-        date_str=date_str,
-        category=category,
+        q=filters["q"],
+        city=filters["city"],
+        date_str=request.args.get("date", ""),
+        category=filters["category"],
         categories=CATEGORIES,
         cities=CITIES,
-        featured=events[:3],
-        upcoming=events[:6],
-    )
+        sort_options=SORT_OPTIONS,
+        sort=filters["sort"],
+        range_args={k: v for k, v in request.args.items() if k in RANGE_ARGS and v},
+        featured_cards=featured_cards,
+        upcoming_cards=upcoming_cards,
+        next_cursor=next_cursor,
+    ))
+    return _with_cache_validators(response, etag, last_modified)
+
+
+@app.get("/api/events")
+def api_events():
+    filters = _listing_filters(request.args)
+    limit = _safe_int(request.args.get("limit", str(API_PAGE_SIZE)), default=API_PAGE_SIZE, min_v=1, max_v=API_MAX_PAGE_SIZE)
+
+    fields = [f.strip() for f in (request.args.get("fields") or "").split(",") if f.strip()]
+    unknown = [f for f in fields if f not in EVENT_API_FIELDS]
+    if unknown:
+        return _json_response({"error": f"Unknown fields: {', '.join(unknown)}."}, 400)
+
+    try:
+        events, next_cursor, _ = page_events(limit, cursor=request.args.get("cursor", ""), **filters)
+    except ValueError:
+        return _json_response({"error": "Invalid cursor."}, 400)
+
+    return _json_response({
+        "events": [_event_to_dict(e, fields or list(EVENT_API_FIELDS)) for e in events],
+        "next_cursor": next_cursor or None,
+    })
 
 
 @app.get("/event/<int:event_id>")
 def event_detail(event_id: int):
     event = get_event_or_404(event_id)
-    similar = [e for e in load_events() if e.category == event.category and e.id != event.id][:5]
-    return render_template("event_detail.html", event=event, similar=similar)
+    available = tickets_left(event)
+    etag = _catalog_etag(available)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    response = app.make_response(render_template(
+        "event_detail.html",
+        event=event,
+        similar_cards=_similar_cards(event),
+        available_tickets=available,
+    ))
+    return _with_cache_validators(response, etag)
 
 
 @app.post("/event/<int:event_id>/buy")
@@ -377,12 +682,13 @@ def buy_ticket(event_id: int):
     event = get_event_or_404(event_id)
     qty = _safe_int(request.form.get("qty", "1"), default=1, min_v=1, max_v=8)
 
-    if qty > event.available_tickets:
-        similar = [e for e in load_events() if e.category == event.category and e.id != event.id][:5]
+    available = tickets_left(event)
+    if qty > available:
         return render_template(
             "event_detail.html",
             event=event,
-            similar=similar,
+            similar_cards=_similar_cards(event),
+            available_tickets=available,
             buy_error="Not enough tickets available for that quantity.",
         ), 400
 
@@ -424,10 +730,18 @@ def login():
                 field_errors={"email": " ", "password": " "},
                 form={"email": clean["email"]},
             ), 401
-        elif user.get("locked_until"):
-            _clear_lock_for_user(clean["email"])
 
-    if not user or (user.get("status") or "active").lower() != "active" or not _verify_user_password(user, clean["password"]):
+    try:
+        password_ok = bool(user) and (user.get("status") or "active").lower() == "active" and _verify_user_password(user, clean["password"])
+    except PasswordPoolBusy:
+        return render_template(
+            "login.html",
+            info_message=PASSWORD_BUSY_MESSAGE,
+            field_errors={},
+            form={"email": clean["email"]},
+        ), 503
+
+    if not password_ok:
         if user:
             attempts, lock_applied = _register_failed_login(clean["email"])
             if lock_applied:
@@ -457,7 +771,6 @@ def register():
     if request.method == "GET":
         return render_template("register.html", field_errors={}, form={}, demo_message=None, error=None)
 
-    users = load_users()
     clean, field_errors = validate_register_form(
         full_name=request.form.get("full_name", ""),
         email=request.form.get("email", ""),
@@ -465,7 +778,7 @@ def register():
         password=request.form.get("password", ""),
         confirm_password=request.form.get("confirm_password", ""),
         agree=request.form.get("agree"),
-        email_exists_checker=lambda e: any((u.get("email") or "").strip().lower() == e for u in users),
+        email_exists_checker=STORAGE.user_email_exists,
     )
 
     if field_errors:
@@ -477,20 +790,29 @@ def register():
             demo_message=None,
         ), 400
 
-    next_id = max([u.get("id", 0) for u in users], default=0) + 1
-    users.append(
+    try:
+        password_data = hash_user_password(clean["password"])
+    except PasswordPoolBusy:
+        return render_template(
+            "register.html",
+            field_errors={},
+            form=clean,
+            error=PASSWORD_BUSY_MESSAGE,
+            demo_message=None,
+        ), 503
+
+    STORAGE.append_user(
         {
-            "id": next_id,
+            "id": STORAGE.next_user_id(),
             "full_name": clean["full_name"],
             "email": clean["email"],
             "phone_encrypted": _encrypt_field(clean["phone"]),
-            "password_data": hash_password(clean["password"]),
+            "password_data": password_data,
             "role": "user",
             "status": "active",
             "locked_until": "",
         }
     )
-    save_users(users)
     return redirect(url_for("login", registered="1"))
 
 
@@ -505,14 +827,22 @@ def logout():
 @require_login
 def dashboard():
     paid = request.args.get("paid") == "1"
+    page = _safe_int(request.args.get("page", "1"), default=1, min_v=1, max_v=1_000_000)
     user = get_current_user()
-    orders = [o for o in load_orders() if (o.get("user_email") or "").strip().lower() == (user.get("email") or "").strip().lower()]
-    orders.sort(key=lambda o: o.get("created_at", ""), reverse=True)
+    orders, total = STORAGE.orders_for_user(
+        user.get("email") or "",
+        limit=DASHBOARD_PAGE_SIZE,
+        offset=(page - 1) * DASHBOARD_PAGE_SIZE,
+    )
     return render_template(
         "dashboard.html",
         user_name=user.get("full_name") or "User",
         paid=paid,
         orders=orders,
+        page=page,
+        has_prev=page > 1,
+        has_next=page * DASHBOARD_PAGE_SIZE < total,
+        total_orders=total,
     )
 
 
@@ -522,7 +852,14 @@ def checkout(event_id: int):
     event = get_event_or_404(event_id)
     qty = _safe_int(request.args.get("qty", "1"), default=1, min_v=1, max_v=8)
 
-    if qty > event.available_tickets:
+    admission_token = _admission_token()
+    status, position = CHECKOUT_ADMISSION.admit(event.id, admission_token)
+    if status != ADMITTED:
+        return _waiting_room(event, qty, status, position)
+
+    hold = _checkout_hold(event, qty)
+    if hold is None:
+        CHECKOUT_ADMISSION.release(event.id, admission_token)
         abort(400)
 
     service_fee = 5.00
@@ -568,30 +905,45 @@ def checkout(event_id: int):
             form_data=form_data,
         ), 400
 
-    orders = load_orders()
-    order_id = next_order_id(orders)
+    if not INVENTORY.commit(hold["id"]):
+        session.pop("checkout_hold", None)
+        return render_template(
+            "checkout.html",
+            event=event,
+            qty=qty,
+            subtotal=subtotal,
+            service_fee=service_fee,
+            total=total,
+            errors={"hold": "Your ticket reservation expired. Please start the checkout again."},
+            form_data=form_data,
+        ), 409
+    session.pop("checkout_hold", None)
+
     current_user = get_current_user()
-    orders.append(
-        {
-            "id": order_id,
-            "user_email": (current_user.get("email") or "").strip().lower(),
-            "event_id": event.id,
-            "event_title": event.title,
-            "qty": qty,
-            "unit_price": event.price_usd,
-            "service_fee": service_fee,
-            "total": total,
-            "status": "PAID",
-            "created_at": _now_utc().isoformat(),
-            "payment": {
-                "exp_date": clean.get("exp_date", ""),
-                "name_on_card": clean.get("name_on_card", ""),
-                "billing_email_encrypted": _encrypt_field(clean.get("billing_email", "")),
-                "card_masked": f"**** **** **** {clean.get('card_last4', '')}",
-            },
-        }
-    )
-    save_orders(orders)
+    try:
+        append_order(
+            {
+                "user_email": (current_user.get("email") or "").strip().lower(),
+                "event_id": event.id,
+                "event_title": event.title,
+                "qty": qty,
+                "unit_price": event.price_usd,
+                "service_fee": service_fee,
+                "total": total,
+                "status": "PAID",
+                "created_at": _now_utc().isoformat(),
+                "payment": {
+                    "exp_date": clean.get("exp_date", ""),
+                    "name_on_card": clean.get("name_on_card", ""),
+                    "billing_email_encrypted": _encrypt_field(clean.get("billing_email", "")),
+                    "card_masked": f"**** **** **** {clean.get('card_last4', '')}",
+                },
+            }
+        )
+    except Exception:
+        INVENTORY.restock(event.id, qty)
+        raise
+    CHECKOUT_ADMISSION.release(event.id, admission_token)
     return redirect(url_for("dashboard", paid="1"))
 
 
@@ -606,18 +958,26 @@ def profile():
     }
     field_errors: dict[str, str] = {}
     success_msg = None
+    status = 200
 
     if request.method == "POST":
-        users = load_users()
-        clean, field_errors = validate_profile_form(
-            full_name=request.form.get("full_name", ""),
-            phone=request.form.get("phone", ""),
-            current_password=request.form.get("current_password", ""),
-            new_password=request.form.get("new_password", ""),
-            confirm_new_password=request.form.get("confirm_new_password", ""),
-            password_verifier=lambda current_password: _verify_user_password(user, current_password),
-            user_email=(user.get("email") or "").strip().lower(),
-        )
+        try:
+            clean, field_errors = validate_profile_form(
+                full_name=request.form.get("full_name", ""),
+                phone=request.form.get("phone", ""),
+                current_password=request.form.get("current_password", ""),
+                new_password=request.form.get("new_password", ""),
+                confirm_new_password=request.form.get("confirm_new_password", ""),
+                password_verifier=lambda current_password: _verify_user_password(user, current_password),
+                user_email=(user.get("email") or "").strip().lower(),
+            )
+            new_password_data = None
+            if not field_errors and clean.get("new_password"):
+                new_password_data = hash_user_password(clean["new_password"])
+        except PasswordPoolBusy:
+            clean = {"full_name": request.form.get("full_name", ""), "phone": request.form.get("phone", "")}
+            field_errors = {"current_password": PASSWORD_BUSY_MESSAGE}
+            status = 503
 
         form.update({
             "full_name": clean.get("full_name", ""),
@@ -626,17 +986,15 @@ def profile():
         })
 
         if not field_errors:
-            email_norm = (user.get("email") or "").strip().lower()
-            for u in users:
-                if (u.get("email") or "").strip().lower() == email_norm:
-                    u["full_name"] = clean["full_name"]
-                    u["phone_encrypted"] = _encrypt_field(clean["phone"])
-                    u.pop("phone", None)
-                    if clean.get("new_password"):
-                        u.pop("password", None)
-                        u["password_data"] = hash_password(clean["new_password"])
-                    break
-            save_users(users)
+            changes = {
+                "full_name": clean["full_name"],
+                "phone_encrypted": _encrypt_field(clean["phone"]),
+            }
+            remove: tuple[str, ...] = ("phone",)
+            if new_password_data:
+                changes["password_data"] = new_password_data
+                remove += ("password",)
+            update_user(user.get("email") or "", changes, remove)
             success_msg = "Profile updated successfully."
 
     return render_template(
@@ -644,7 +1002,7 @@ def profile():
         form=form,
         field_errors=field_errors,
         success_message=success_msg,
-    )
+    ), status
 
 
 @app.get("/admin/users")
@@ -654,11 +1012,14 @@ def admin_users():
     role = (request.args.get("role") or "all").strip().lower()
     status = (request.args.get("status") or "all").strip().lower()
     lockout = (request.args.get("lockout") or "all").strip().lower()
+    page = _safe_int(request.args.get("page", "1"), default=1, min_v=1, max_v=1_000_000)
 
+    lockouts = LOGIN_TRACKER.active_lockouts()
     users = []
     for raw in load_users():
         u = _user_with_defaults(raw)
-        u["phone"] = _decrypt_phone(u)
+        until = lockouts.get(normalize_email(u.get("email")))
+        u["locked_until"] = datetime.utcfromtimestamp(until).isoformat(timespec="seconds") if until else ""
         users.append(u)
 
     if q:
@@ -669,32 +1030,41 @@ def admin_users():
         users = [u for u in users if (u.get("status", "active").lower() == status)]
     if lockout != "all":
         if lockout == "locked":
-            users = [u for u in users if _is_locked(u)[0]]
+            users = [u for u in users if u["locked_until"]]
         elif lockout == "not_locked":
-            users = [u for u in users if not _is_locked(u)[0]]
+            users = [u for u in users if not u["locked_until"]]
+
+    total = len(users)
+    offset = (page - 1) * ADMIN_USERS_PAGE_SIZE
+    page_users = heapq.nsmallest(
+        offset + ADMIN_USERS_PAGE_SIZE,
+        users,
+        key=lambda u: (u.get("full_name", "").lower(), u.get("id", 0)),
+    )[offset:]
+    for u, phone in zip(page_users, _decrypt_phones(page_users)):
+        u["phone"] = phone
 
-    users.sort(key=lambda u: (u.get("full_name", "").lower(), u.get("id", 0)))
     return render_template(
         "admin_users.html",
-        users=users,
+        users=page_users,
         filters={"q": q, "role": role, "status": status, "lockout": lockout},
-        total=len(users),
+        total=total,
+        page=page,
+        first=offset + 1 if page_users else 0,
+        last=offset + len(page_users) if page_users else 0,
+        has_prev=page > 1,
+        has_next=offset + ADMIN_USERS_PAGE_SIZE < total,
     )
 
 
 @app.post("/admin/users/<int:user_id>/toggle")
 #@require_role("admin")
 def admin_toggle_user(user_id: int):
-    users = load_users()
+    target = STORAGE.find_user_by_id(user_id)
     current_user = get_current_user()
-    for u in users:
-        if int(u.get("id", 0)) == user_id:
-            if (u.get("email") or "").strip().lower() == (current_user.get("email") or "").strip().lower():
-                break
-            u.setdefault("status", "active")
-            u["status"] = "disabled" if u["status"] == "active" else "active"
-            break
-    save_users(users)
+    if target and normalize_email(target.get("email")) != normalize_email(current_user.get("email")):
+        status = target.get("status", "active")
+        update_user(target.get("email") or "", {"status": "disabled" if status == "active" else "active"})
     return redirect(url_for("admin_users"))
 
 
@@ -704,21 +1074,19 @@ def admin_change_role(user_id: int):
     new_role = (request.form.get("role", "user") or "user").strip().lower()
     if new_role not in {"user", "admin"}:
         new_role = "user"
-    users = load_users()
+    target = STORAGE.find_user_by_id(user_id)
     current_user = get_current_user()
-    for u in users:
-        if int(u.get("id", 0)) == user_id:
-            if current_user and (u.get("email") or "").strip().lower() == (current_user.get("email") or "").strip().lower() and new_role != "admin":
-                break
-            u["role"] = new_role
-            break
-    save_users(users)
+    if target:
+        is_self = current_user and normalize_email(target.get("email")) == normalize_email(current_user.get("email"))
+        if not (is_self and new_role != "admin"):
+            update_user(target.get("email") or "", {"role": new_role})
     return redirect(url_for("admin_users"))
 
 @app.get("/admin/users/list")
 def admin_list_users():
+    ensure_data_files()
     users = []
-    for raw in load_users():
+    for raw in STORAGE.iter_users(fields=("id", "full_name", "email", "role", "status")):
         u = _user_with_defaults(raw)
         users.append({
             "id": u.get("id"),
@@ -735,7 +1103,9 @@ def handle_forbidden(_error):
 
 
 ensure_data_files()
-_migrate_old_orders()
+if pending_migrations(DATA_DIR):
+    app.logger.warning("Data schema is behind (version %d, latest %d); run `python migrations.py`.",
+                       schema_version(DATA_DIR), LATEST_VERSION)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,450 @@
+from __future__ import annotations
+
+import base64
+import json
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, AbstractSet, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from catalog_snapshot import file_signature, load_snapshot, rows_revision
+from recommend import TOP_K, build_neighbors, neighbors_of
+from search import SearchIndex
+
+if TYPE_CHECKING:
+    from storage import Storage
+
+
+EPOCH = datetime(1970, 1, 1)
+SORT_OPTIONS = ("date", "price_asc", "price_desc")
+
+
+def _seconds_of(value: datetime) -> int:
+    return int((value - EPOCH).total_seconds())
+
+
+def _to_seconds(value: str) -> int:
+    return _seconds_of(datetime.fromisoformat(value))
+
+
+def _from_seconds(seconds: int) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class Event:
+    __slots__ = ("_state", "_row")
+
+    def __init__(self, state: "_CatalogState", row: int) -> None:
+        self._state = state
+        self._row = row
+
+    @property
+    def id(self) -> int:
+        return self._state.ids[self._row]
+
+    @property
+    def title(self) -> str:
+        return self._state.titles[self._row]
+
+    @property
+    def category(self) -> str:
+        return self._state.categories[self._state.category_codes[self._row]]
+
+    @property
+    def city(self) -> str:
+        return self._state.cities[self._state.city_codes[self._row]]
+
+    @property
+    def venue(self) -> str:
+        return self._state.venues[self._row]
+
+    @property
+    def start(self) -> datetime:
+        return _from_seconds(self._state.starts[self._row])
+
+    @property
+    def end(self) -> datetime:
+        return _from_seconds(self._state.ends[self._row])
+
+    @property
+    def price_usd(self) -> float:
+        return self._state.prices[self._row]
+
+    @property
+    def available_tickets(self) -> int:
+        return self._state.tickets[self._row]
+
+    @property
+    def banner_url(self) -> str:
+        return self._state.banners[self._row]
+
+    @property
+    def description(self) -> str:
+        return self._state.descriptions[self._row]
+
+    @property
+    def catalog_version(self) -> int:
+        return self._state.version
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Event):
+            return NotImplemented
+        return self._state is other._state and self._row == other._row
+
+    def __hash__(self) -> int:
+        return hash((id(self._state), self._row))
+
+    def __repr__(self) -> str:
+        return f"Event(id={self.id}, title={self.title!r}, start={self.start.isoformat()})"
+
+
+def _code(value: str, index: Dict[str, int], table: List[str]) -> int:
+    code = index.get(value)
+    if code is None:
+        code = index[value] = len(table)
+        table.append(sys.intern(value))
+    return code
+
+
+class _CatalogState:
+    __slots__ = (
+        "ids", "starts", "ends", "prices", "tickets",
+        "category_codes", "city_codes", "categories", "cities",
+        "titles", "venues", "banners", "descriptions",
+        "id_order", "price_order", "sorted_prices", "by_category", "by_city", "neighbors", "top_k",
+        "neighbor_cache", "version",
+    )
+
+    def __init__(self, rows: List[dict]) -> None:
+        parsed = sorted(((_to_seconds(r["start"]), int(r["id"]), r) for r in rows), key=lambda t: t[:2])
+        self.ids = array("q", (event_id for _, event_id, _ in parsed))
+        self.starts = array("q", (start for start, _, _ in parsed))
+        self.ends = array("q", (_to_seconds(r["end"]) for _, _, r in parsed))
+        self.prices = array("d", (float(r["price_usd"]) for _, _, r in parsed))
+        self.tickets = array("q", (int(r["available_tickets"]) for _, _, r in parsed))
+
+        self.categories: List[str] = []
+        self.cities: List[str] = []
+        category_index: Dict[str, int] = {}
+        city_index: Dict[str, int] = {}
+        self.category_codes = array("I", (_code(r["category"], category_index, self.categories) for _, _, r in parsed))
+        self.city_codes = array("I", (_code(r["city"], city_index, self.cities) for _, _, r in parsed))
+
+        self.titles = [r["title"] for _, _, r in parsed]
+        self.venues = [sys.intern(r["venue"]) for _, _, r in parsed]
+        self.banners = [sys.intern(r.get("banner_url", "")) for _, _, r in parsed]
+        self.descriptions = [r.get("description", "") for _, _, r in parsed]
+        del parsed
+
+        self.id_order = array("q", sorted(range(len(self.ids)), key=self.ids.__getitem__))
+        self.price_order = array("q", sorted(range(len(self.ids)), key=self.prices.__getitem__))
+        self.sorted_prices = array("d", (self.prices[row] for row in self.price_order))
+        category_rows = [array("q") for _ in self.categories]
+        city_rows = [array("q") for _ in self.cities]
+        for row in range(len(self.ids)):
+            category_rows[self.category_codes[row]].append(row)
+            city_rows[self.city_codes[row]].append(row)
+        self.by_category: Dict[str, array] = dict(zip(self.categories, category_rows))
+        self.by_city: Dict[str, array] = dict(zip(self.cities, city_rows))
+        self.top_k = TOP_K
+        self.neighbors: Optional[array] = None
+        self.neighbor_cache: Dict[int, List[int]] = {}
+        self.version = 0
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any], top_k: int) -> "_CatalogState":
+        state = cls.__new__(cls)
+        for name in cls.__slots__:
+            if name not in ("top_k", "neighbor_cache", "version"):
+                setattr(state, name, columns[name])
+        state.top_k = top_k
+        state.neighbor_cache = {}
+        state.version = 0
+        return state
+
+    def _neighbor_inputs(self) -> tuple:
+        return (
+            self.category_codes,
+            self.city_codes,
+            self.starts,
+            self.prices,
+            [self.by_category[name] for name in self.categories],
+            [self.by_city[name] for name in self.cities],
+            self.top_k,
+        )
+
+    def neighbors_of(self, row: int) -> Sequence[int]:
+        if self.neighbors is not None:
+            return [other for other in self.neighbors[row * self.top_k:(row + 1) * self.top_k] if other >= 0]
+        ranked = self.neighbor_cache.get(row)
+        if ranked is None:
+            ranked = self.neighbor_cache[row] = neighbors_of(row, *self._neighbor_inputs())
+        return ranked
+
+    def materialize_neighbors(self) -> None:
+        if self.neighbors is None:
+            self.neighbors = build_neighbors(*self._neighbor_inputs())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of(self, event_id: int) -> Optional[int]:
+        ids, order = self.ids, self.id_order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[order[mid]] < event_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and ids[order[lo]] == event_id:
+            return order[lo]
+        return None
+
+
+class EventCatalog:
+    def __init__(self, source: "Storage", snapshot_path: Optional[Path] = None) -> None:
+        self.source = source
+        self.snapshot_path = snapshot_path
+        self.version = 0
+        self.revision = ""
+        self.modified_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
+        self._state = _CatalogState([])
+        self.search_index = SearchIndex()
+        self._search_state: Optional[_CatalogState] = None
+
+    def _current_signature(self) -> tuple:
+        snapshot = file_signature(self.snapshot_path) if self.snapshot_path is not None else None
+        return self.source.events_signature(), snapshot
+
+    def _load_state(self, source_signature: Optional[tuple]) -> Tuple[_CatalogState, str]:
+        if self.snapshot_path is not None:
+            snapshot = load_snapshot(self.snapshot_path)
+            if snapshot is not None and snapshot.signature == list(source_signature or ()):
+                return _CatalogState.from_columns(snapshot.columns, snapshot.top_k), snapshot.revision
+        rows = self.source.load_event_rows()
+        return _CatalogState(rows), rows_revision(rows)
+
+    def refresh(self, force: bool = False) -> None:
+        signature = self._current_signature()
+        if not force and signature == self._signature and self.version:
+            return
+        with self._lock:
+            signature = self._current_signature()
+            if not force and signature == self._signature and self.version:
+                return
+            state, self.revision = self._load_state(signature[0])
+            state.version = self.version + 1
+            self._state = state
+            self._signature = signature
+            self.modified_at = self.source.events_modified_at()
+            self.version = state.version
+
+    def _search(self, state: _CatalogState, text: str) -> Dict[int, float]:
+        with self._lock:
+            if self._search_state is not state:
+                self.search_index.sync(Event(state, row) for row in range(len(state)))
+                self._search_state = state
+        return self.search_index.search(text)
+
+    def invalidate(self) -> None:
+        self.refresh(force=True)
+
+    def all(self) -> List[Event]:
+        self.refresh()
+        state = self._state
+        return [Event(state, row) for row in range(len(state))]
+
+    def get(self, event_id: int) -> Optional[Event]:
+        self.refresh()
+        state = self._state
+        row = state.row_of(event_id)
+        return None if row is None else Event(state, row)
+
+    def similar(self, event: Event, limit: int = 5) -> List[Event]:
+        state = event._state
+        return [Event(state, other) for other in state.neighbors_of(event._row)[:limit]]
+
+    def _iter_matches(
+        self,
+        state: _CatalogState,
+        after: Optional[tuple],
+        category: Optional[str] = None,
+        city: Optional[str] = None,
+        day: Optional[date] = None,
+        text: str = "",
+        start_from: Optional[datetime] = None,
+        start_to: Optional[datetime] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        only_available: bool = False,
+        exclude_ids: AbstractSet[int] = frozenset(),
+        sort: str = "date",
+    ) -> Iterator[Tuple[tuple, int]]:
+        category_code = state.categories.index(category) if category in state.by_category else -1
+        city_code = state.cities.index(city) if city in state.by_city else -1
+        if (category is not None and category_code < 0) or (city is not None and city_code < 0):
+            return
+
+        starts, ids, prices, tickets = state.starts, state.ids, state.prices, state.tickets
+        start_lo = _seconds_of(start_from) if start_from is not None else None
+        start_hi = _seconds_of(start_to) if start_to is not None else None
+        if day is not None:
+            day_lo = _seconds_of(datetime.combine(day, time.min))
+            start_lo = day_lo if start_lo is None else max(start_lo, day_lo)
+            start_hi = day_lo + 86400 if start_hi is None else min(start_hi, day_lo + 86400)
+
+        def matches(row: int) -> bool:
+            if category is not None and state.category_codes[row] != category_code:
+                return False
+            if city is not None and state.city_codes[row] != city_code:
+                return False
+            if start_lo is not None and starts[row] < start_lo:
+                return False
+            if start_hi is not None and starts[row] >= start_hi:
+                return False
+            if min_price is not None and prices[row] < min_price:
+                return False
+            if max_price is not None and prices[row] > max_price:
+                return False
+            if only_available and (tickets[row] <= 0 or ids[row] in exclude_ids):
+                return False
+            return True
+
+        def sort_key(row: int) -> tuple:
+            if sort == "price_asc":
+                return prices[row], starts[row], ids[row]
+            if sort == "price_desc":
+                return -prices[row], starts[row], ids[row]
+            return starts[row], ids[row]
+
+        if text.strip():
+            scores = self._search(state, text)
+            ranked = []
+            for event_id, score in scores.items():
+                row = state.row_of(event_id)
+                if row is not None and matches(row):
+                    key = (-score, starts[row], event_id) if sort == "date" else sort_key(row)
+                    ranked.append((key, row))
+            ranked.sort(key=lambda item: item[0])
+            for key, row in ranked:
+                if after is None or key > after:
+                    yield key, row
+            return
+
+        lo = bisect_left(starts, start_lo) if start_lo is not None else 0
+        hi = bisect_left(starts, start_hi, lo) if start_hi is not None else len(state)
+        if sort == "date" and after is not None:
+            lo = max(lo, bisect_left(starts, after[0]))
+        plo = bisect_left(state.sorted_prices, min_price) if min_price is not None else 0
+        phi = bisect_right(state.sorted_prices, max_price, plo) if max_price is not None else len(state)
+        if sort == "price_asc" and after is not None:
+            plo = max(plo, bisect_left(state.sorted_prices, after[0], plo))
+        elif sort == "price_desc" and after is not None:
+            phi = min(phi, bisect_right(state.sorted_prices, -after[0], plo))
+
+        # Drive the scan from the narrowest index; only the price index yields rows in price order.
+        sources: List[Tuple[int, str, Sequence[int]]] = [(max(hi - lo, 0), "date", range(lo, hi))]
+        for posting in (
+            state.by_category[category] if category is not None else None,
+            state.by_city[city] if city is not None else None,
+        ):
+            if posting is not None:
+                i = bisect_left(posting, lo)
+                j = bisect_left(posting, hi, i)
+                sources.append((j - i, "date", posting[i:j]))
+        if min_price is not None or max_price is not None or sort != "date":
+            sources.append((max(phi - plo, 0), "price", range(plo, phi)))
+        _, order, positions = min(sources, key=lambda source: source[0])
+
+        if order == "date" and sort == "date":
+            rows: Iterable[int] = positions
+        elif order == "price" and sort == "price_asc":
+            rows = (state.price_order[i] for i in positions)
+        elif order == "price" and sort == "price_desc":
+            rows = self._price_desc(state, plo, phi)
+        else:
+            rows = sorted(
+                (state.price_order[i] for i in positions) if order == "price" else positions,
+                key=sort_key,
+            )
+
+        for row in rows:
+            if not matches(row):
+                continue
+            key = sort_key(row)
+            if after is not None and key <= after:
+                continue
+            yield key, row
+
+    @staticmethod
+    def _price_desc(state: _CatalogState, plo: int, phi: int) -> Iterator[int]:
+        prices, order = state.sorted_prices, state.price_order
+        j = phi
+        while j > plo:
+            i = bisect_left(prices, prices[j - 1], plo, j)
+            yield from (order[k] for k in range(i, j))
+            j = i
+
+    @staticmethod
+    def _internal_cursor(cursor: str, ranked: bool) -> Optional[tuple]:
+        after = decode_cursor(cursor, ranked)
+        if after is None:
+            return None
+        return after[:-2] + (_seconds_of(after[-2]), after[-1])
+
+    def query(
+        self,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: str = "",
+        **filters: Any,
+    ) -> List[Event]:
+        self.refresh()
+        state = self._state
+        after = self._internal_cursor(cursor, ranked=_ranked(filters))
+        rows = self._iter_matches(state, after, **filters)
+        stop = None if limit is None else offset + limit
+        return [Event(state, row) for _, row in islice(rows, offset, stop)]
+
+    def page(self, limit: int, cursor: str = "", **filters: Any) -> Tuple[List[Event], str, int]:
+        self.refresh()
+        state = self._state
+        after = self._internal_cursor(cursor, ranked=_ranked(filters))
+        rows = list(islice(self._iter_matches(state, after, **filters), limit + 1))
+        next_cursor = ""
+        if len(rows) > limit:
+            key = rows[limit - 1][0]
+            next_cursor = encode_cursor(key[:-2] + (_from_seconds(key[-2]), key[-1]))
+        return [Event(state, row) for _, row in rows[:limit]], next_cursor, state.version
+
+
+def _ranked(filters: Dict[str, Any]) -> bool:
+    return bool((filters.get("text") or "").strip()) or filters.get("sort", "date") != "date"
+
+
+def encode_cursor(key: tuple) -> str:
+    parts = [k.isoformat() if isinstance(k, datetime) else k for k in key]
+    raw = json.dumps(parts, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, ranked: bool = False) -> Optional[tuple]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if ranked:
+            score, start, event_id = parts
+            return float(score), datetime.fromisoformat(start), int(event_id)
+        start, event_id = parts
+        return datetime.fromisoformat(start), int(event_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError("Invalid cursor.") from None
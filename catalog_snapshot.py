@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MAGIC = b"EHCATv2\n"
+META_LENGTH = struct.Struct("<Q")
+ALIGN = 8
+NUMERIC_COLUMNS = (
+    ("ids", "q"),
+    ("starts", "q"),
+    ("ends", "q"),
+    ("prices", "d"),
+    ("tickets", "q"),
+    ("category_codes", "I"),
+    ("city_codes", "I"),
+    ("id_order", "q"),
+    ("price_order", "q"),
+    ("sorted_prices", "d"),
+    ("neighbors", "q"),
+)
+TEXT_COLUMNS = ("titles", "venues", "banners", "descriptions")
+POSTING_COLUMNS = (("by_category", "categories"), ("by_city", "cities"))
+
+
+def rows_revision(rows: List[dict]) -> str:
+    return hashlib.sha1(json.dumps(rows, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class TextColumn:
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, data: memoryview, offsets: memoryview) -> None:
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return str(self._data[self._offsets[row]:self._offsets[row + 1]], "utf-8")
+
+
+class Snapshot:
+    __slots__ = ("signature", "revision", "top_k", "columns")
+
+    def __init__(self, signature: Any, revision: str, top_k: int, columns: Dict[str, Any]) -> None:
+        self.signature = signature
+        self.revision = revision
+        self.top_k = top_k
+        self.columns = columns
+
+
+def _text_sections(values: Sequence[str]) -> Tuple[array, bytes]:
+    offsets = array("q", [0])
+    chunks: List[bytes] = []
+    total = 0
+    for value in values:
+        encoded = value.encode("utf-8")
+        chunks.append(encoded)
+        total += len(encoded)
+        offsets.append(total)
+    return offsets, b"".join(chunks)
+
+
+def _posting_sections(names: Sequence[str], postings: Dict[str, Sequence[int]]) -> Tuple[array, array]:
+    index = array("q", [0])
+    rows = array("q")
+    for name in names:
+        rows.extend(postings[name])
+        index.append(len(rows))
+    return index, rows
+
+
+def write_snapshot(path: Path, state: Any, signature: Any, revision: str, top_k: int) -> int:
+    sections: List[Tuple[str, str, bytes]] = []
+    for name, typecode in NUMERIC_COLUMNS:
+        sections.append((name, typecode, array(typecode, getattr(state, name)).tobytes()))
+    for name in TEXT_COLUMNS:
+        offsets, data = _text_sections(getattr(state, name))
+        sections.append((f"{name}.offsets", "q", offsets.tobytes()))
+        sections.append((f"{name}.data", "B", data))
+    for name, table in POSTING_COLUMNS:
+        index, rows = _posting_sections(getattr(state, table), getattr(state, name))
+        sections.append((f"{name}.index", "q", index.tobytes()))
+        sections.append((f"{name}.rows", "q", rows.tobytes()))
+
+    layout: Dict[str, List[Any]] = {}
+    position = 0
+    for name, typecode, data in sections:
+        layout[name] = [position, len(data), typecode]
+        position = _align(position + len(data))
+    meta = json.dumps({
+        "count": len(state.ids),
+        "top_k": top_k,
+        "signature": signature,
+        "revision": revision,
+        "categories": list(state.categories),
+        "cities": list(state.cities),
+        "sections": layout,
+    }).encode("utf-8")
+    data_start = _align(len(MAGIC) + META_LENGTH.size + len(meta))
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as handle:
+        handle.write(MAGIC)
+        handle.write(META_LENGTH.pack(len(meta)))
+        handle.write(meta)
+        for name, _, data in sections:
+            handle.write(b"\0" * (data_start + layout[name][0] - handle.tell()))
+            handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp, path)
+    return data_start + position
+
+
+def _align(position: int) -> int:
+    return (position + ALIGN - 1) // ALIGN * ALIGN
+
+
+def load_snapshot(path: Path) -> Optional[Snapshot]:
+    try:
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return _parse_snapshot(memoryview(mapped))
+    except (struct.error, ValueError, KeyError, TypeError, IndexError):
+        return None
+
+
+def _parse_snapshot(view: memoryview) -> Optional[Snapshot]:
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        return None
+    (meta_length,) = META_LENGTH.unpack_from(view, len(MAGIC))
+    start = len(MAGIC) + META_LENGTH.size
+    meta = json.loads(bytes(view[start:start + meta_length]))
+    data_start = _align(start + meta_length)
+
+    def section(name: str) -> memoryview:
+        offset, size, typecode = meta["sections"][name]
+        data = view[data_start + offset:data_start + offset + size]
+        if len(data) != size:
+            raise ValueError(f"snapshot section {name} is truncated")
+        return data.cast(typecode)
+
+    columns: Dict[str, Any] = {name: section(name) for name, _ in NUMERIC_COLUMNS}
+    for name in TEXT_COLUMNS:
+        columns[name] = TextColumn(section(f"{name}.data"), section(f"{name}.offsets"))
+    columns["categories"] = meta["categories"]
+    columns["cities"] = meta["cities"]
+    for name, table in POSTING_COLUMNS:
+        index, rows = section(f"{name}.index"), section(f"{name}.rows")
+        columns[name] = {value: rows[index[code]:index[code + 1]] for code, value in enumerate(meta[table])}
+    return Snapshot(meta["signature"], meta["revision"], meta["top_k"], columns)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile the event catalog into a memory-mappable snapshot.")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default=os.environ.get("EVENTHUB_STORAGE", "json"))
+    parser.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parent / "data")
+    parser.add_argument("--sqlite-path", type=Path, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    from catalog import _CatalogState
+    from recommend import TOP_K
+    from storage import open_storage
+
+    source = open_storage(args.storage, args.data_dir, args.sqlite_path)
+    signature = source.events_signature()
+    rows = source.load_event_rows()
+    output = args.output or args.data_dir / "catalog.snap"
+    state = _CatalogState(rows)
+    state.materialize_neighbors()
+    size = write_snapshot(output, state, list(signature or ()), rows_revision(rows), TOP_K)
+    print(f"Wrote {len(rows)} events to {output} ({size} bytes).")
+
+
+if __name__ == "__main__":
+    main()
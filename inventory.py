@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock (
+    event_id INTEGER PRIMARY KEY,
+    sold INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS holds (
+    id TEXT PRIMARY KEY,
+    event_id INTEGER NOT NULL,
+    qty INTEGER NOT NULL,
+    owner TEXT NOT NULL DEFAULT '',
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_holds_event ON holds (event_id, expires_at);
+CREATE INDEX IF NOT EXISTS idx_holds_expiry ON holds (expires_at);
+"""
+
+
+class Inventory:
+    def __init__(self, db_path: Path, hold_seconds: int = 600) -> None:
+        self.db_path = db_path
+        self.hold_seconds = hold_seconds
+        self._local = threading.local()
+        self._connect().executescript(INVENTORY_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _begin(self) -> sqlite3.Connection:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def _counts(self, conn: sqlite3.Connection, event_id: int) -> tuple[int, int]:
+        sold = conn.execute("SELECT sold FROM stock WHERE event_id = ?", (event_id,)).fetchone()
+        held = conn.execute(
+            "SELECT COALESCE(SUM(qty), 0) FROM holds WHERE event_id = ? AND expires_at > ?",
+            (event_id, time.time()),
+        ).fetchone()
+        return (sold[0] if sold else 0), held[0]
+
+    def available(self, event_id: int, capacity: int) -> int:
+        sold, held = self._counts(self._connect(), event_id)
+        return max(0, capacity - sold - held)
+
+    def committed(self) -> Dict[int, int]:
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT event_id, sold FROM stock WHERE sold > 0").fetchall())
+        for event_id, held in conn.execute(
+            "SELECT event_id, SUM(qty) FROM holds WHERE expires_at > ? GROUP BY event_id", (time.time(),)
+        ):
+            counts[event_id] = counts.get(event_id, 0) + held
+        return counts
+
+    def reserve(self, event_id: int, capacity: int, qty: int, owner: str = "") -> Optional[str]:
+        now = time.time()
+        conn = self._begin()
+        try:
+            conn.execute("DELETE FROM holds WHERE expires_at <= ?", (now,))
+            sold, held = self._counts(conn, event_id)
+            if capacity - sold - held < qty:
+                conn.execute("COMMIT")
+                return None
+            hold_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO holds (id, event_id, qty, owner, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (hold_id, event_id, qty, owner, now + self.hold_seconds),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return hold_id
+
+    def is_active(self, hold_id: str) -> bool:
+        row = self._connect().execute(
+            "SELECT 1 FROM holds WHERE id = ? AND expires_at > ?", (hold_id, time.time())
+        ).fetchone()
+        return row is not None
+
+    def commit(self, hold_id: str) -> bool:
+        conn = self._begin()
+        try:
+            row = conn.execute(
+                "SELECT event_id, qty FROM holds WHERE id = ? AND expires_at > ?", (hold_id, time.time())
+            ).fetchone()
+            conn.execute("DELETE FROM holds WHERE id = ?", (hold_id,))
+            if row is not None:
+                conn.execute(
+                    "INSERT INTO stock (event_id, sold) VALUES (?, ?) "
+                    "ON CONFLICT(event_id) DO UPDATE SET sold = sold + excluded.sold",
+                    row,
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return row is not None
+
+    def release(self, hold_id: str) -> None:
+        self._connect().execute("DELETE FROM holds WHERE id = ?", (hold_id,))
+
+    def restock(self, event_id: int, qty: int) -> None:
+        self._connect().execute(
+            "UPDATE stock SET sold = MAX(sold - ?, 0) WHERE event_id = ?", (qty, event_id)
+        )
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO, Tuple
+
+READ_CHUNK_SIZE = 1 << 16
+_SKIP = " \t\r\n,"
+
+RecordFilter = Optional[Callable[[dict], bool]]
+
+
+def iter_json_array(path: Path, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    try:
+        handle = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with handle:
+        yield from decode_json_array(handle, chunk_size)
+
+
+def decode_json_array(handle: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    for _, _, value in _decode(handle, chunk_size, spans=False):
+        yield value
+
+
+def decode_json_array_spans(handle: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Tuple[int, int, Any]]:
+    # Yields (byte offset, byte length, value); open the file with newline="" so offsets match the disk.
+    return _decode(handle, chunk_size, spans=True)
+
+
+def _utf8_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def _decode(handle: TextIO, chunk_size: int, spans: bool) -> Iterator[Tuple[int, int, Any]]:
+    decoder = json.JSONDecoder()
+    name = getattr(handle, "name", "input")
+    buffer = ""
+    pos = 0
+    eof = False
+    opened = False
+    base = 0
+    mark = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in (_SKIP if opened else _SKIP[:-1]):
+            pos += 1
+        need_more = pos == len(buffer)
+        if not need_more:
+            if not opened:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{name} does not contain a JSON array.")
+                opened = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise
+                need_more = True
+            else:
+                # A scalar cut at the chunk edge (e.g. "1." of "1.5") also decodes, so only accept
+                # a value once the following delimiter has been read.
+                follow = end
+                while follow < len(buffer) and buffer[follow] in _SKIP[:-1]:
+                    follow += 1
+                if eof or (follow < len(buffer) and buffer[follow] in ",]"):
+                    if spans:
+                        base += _utf8_len(buffer[mark:pos])
+                        length = _utf8_len(buffer[pos:end])
+                        yield base, length, value
+                        base += length
+                        mark = end
+                    else:
+                        yield 0, 0, value
+                    pos = end
+                    continue
+                need_more = True
+        if eof:
+            if opened:
+                raise ValueError(f"{name} ends inside a JSON array.")
+            return
+        chunk = handle.read(chunk_size)
+        eof = not chunk
+        if spans:
+            base += _utf8_len(buffer[mark:pos])
+            mark = 0
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def select(records: Iterable[dict], where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    keys = tuple(fields) if fields is not None else None
+    for record in records:
+        if where is not None and not where(record):
+            continue
+        yield record if keys is None else {k: record[k] for k in keys if k in record}
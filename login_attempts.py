@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+from user_store import normalize_email
+
+TRACKER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    email TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_email ON attempts (email, at);
+CREATE INDEX IF NOT EXISTS idx_attempts_at ON attempts (at);
+CREATE TABLE IF NOT EXISTS lockouts (
+    email TEXT PRIMARY KEY,
+    until REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lockouts_until ON lockouts (until);
+"""
+
+
+class LoginAttemptTracker:
+    def __init__(
+        self,
+        db_path: Path,
+        max_attempts: int,
+        window_seconds: int,
+        lockout_seconds: int,
+        max_entries: int,
+        evict_every: int = 100,
+    ) -> None:
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._writes = 0
+        self._local = threading.local()
+        self._connect().executescript(TRACKER_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM attempts WHERE at <= ?", (now - self.window_seconds,))
+        conn.execute("DELETE FROM lockouts WHERE until <= ?", (now,))
+        for table, column in (("attempts", "at"), ("lockouts", "until")):
+            excess = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY {column} LIMIT ?)",
+                    (excess,),
+                )
+
+    def record_failure(self, email: str) -> Tuple[int, bool]:
+        email_norm = normalize_email(email)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM attempts WHERE email = ? AND at <= ?", (email_norm, now - self.window_seconds))
+            conn.execute("INSERT INTO attempts (email, at) VALUES (?, ?)", (email_norm, now))
+            attempts = conn.execute("SELECT COUNT(*) FROM attempts WHERE email = ?", (email_norm,)).fetchone()[0]
+            locked = attempts >= self.max_attempts
+            if locked:
+                conn.execute(
+                    "INSERT INTO lockouts (email, until) VALUES (?, ?) "
+                    "ON CONFLICT(email) DO UPDATE SET until = excluded.until",
+                    (email_norm, now + self.lockout_seconds),
+                )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(conn, now)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return attempts, locked
+
+    def lock_remaining(self, email: str) -> int:
+        row = self._connect().execute(
+            "SELECT until FROM lockouts WHERE email = ?", (normalize_email(email),)
+        ).fetchone()
+        if row is None:
+            return 0
+        return max(0, int(row[0] - time.time()))
+
+    def clear(self, email: str) -> None:
+        email_norm = normalize_email(email)
+        conn = self._connect()
+        pending = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM attempts WHERE email = ?) OR EXISTS (SELECT 1 FROM lockouts WHERE email = ?)",
+            (email_norm, email_norm),
+        ).fetchone()[0]
+        if not pending:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM attempts WHERE email = ?", (email_norm,))
+            conn.execute("DELETE FROM lockouts WHERE email = ?", (email_norm,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def active_lockouts(self) -> Dict[str, float]:
+        rows = self._connect().execute("SELECT email, until FROM lockouts WHERE until > ?", (time.time(),)).fetchall()
+        return {email: until for email, until in rows}
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from storage import Storage
+
+SCHEMA_VERSION_FILE = "schema_version.json"
+CHECKPOINT_FILE = "migration_checkpoint.json"
+DEFAULT_CHUNK_SIZE = 500
+
+FieldEncryptor = Callable[[List[str]], List[dict]]
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[List[dict], FieldEncryptor], List[dict]]
+
+
+def mask_order_payments(orders: List[dict], encrypt_fields: FieldEncryptor) -> List[dict]:
+    changed: List[dict] = []
+    pending: List[dict] = []
+    for order in orders:
+        payment = order.get("payment")
+        if not isinstance(payment, dict):
+            continue
+        dirty = False
+        for key in ("cvv", "card_number"):
+            if key in payment:
+                payment.pop(key)
+                dirty = True
+        if payment.get("card"):
+            last4 = str(payment.pop("card"))[-4:]
+            payment["card_masked"] = f"**** **** **** {last4}"
+            dirty = True
+        if payment.get("billing_email") and not payment.get("billing_email_encrypted"):
+            pending.append(payment)
+            dirty = True
+        if dirty:
+            changed.append(order)
+
+    encrypted = encrypt_fields([p.pop("billing_email") for p in pending])
+    for payment, field in zip(pending, encrypted):
+        payment["billing_email_encrypted"] = field
+    return changed
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, "mask_order_payments", mask_order_payments),
+)
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(json.dumps(data, indent=2))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp, path)
+
+
+def schema_version(data_dir: Path) -> int:
+    data = _read_json(data_dir / SCHEMA_VERSION_FILE) or {}
+    return int(data.get("version", 0))
+
+
+def pending_migrations(data_dir: Path) -> List[Migration]:
+    current = schema_version(data_dir)
+    return [m for m in MIGRATIONS if m.version > current]
+
+
+def run_migrations(
+    storage: Storage,
+    data_dir: Path,
+    encrypt_fields: FieldEncryptor,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Callable[[str], None] = print,
+) -> int:
+    checkpoint_path = data_dir / CHECKPOINT_FILE
+    applied = 0
+    for migration in pending_migrations(data_dir):
+        checkpoint = _read_json(checkpoint_path) or {}
+        offset = int(checkpoint.get("offset", 0)) if checkpoint.get("version") == migration.version else 0
+        if offset:
+            progress(f"[{migration.version}] {migration.name}: resuming after {offset} orders")
+
+        done = offset
+        orders = islice(storage.iter_orders(), offset, None)
+        while True:
+            chunk = list(islice(orders, chunk_size))
+            if not chunk:
+                break
+            changed = migration.apply(chunk, encrypt_fields)
+            if changed:
+                storage.replace_orders(changed)
+            done += len(chunk)
+            _write_json(checkpoint_path, {"version": migration.version, "offset": done})
+            progress(f"[{migration.version}] {migration.name}: {done} orders ({len(changed)} updated)")
+
+        storage.compact_orders()
+        _write_json(data_dir / SCHEMA_VERSION_FILE, {"version": migration.version, "name": migration.name})
+        checkpoint_path.unlink(missing_ok=True)
+        progress(f"[{migration.version}] {migration.name}: done")
+        applied += 1
+    return applied
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Apply pending EventHub data migrations.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--status", action="store_true", help="only print the current schema version")
+    args = parser.parse_args(argv)
+
+    import app
+
+    current = schema_version(app.DATA_DIR)
+    pending = pending_migrations(app.DATA_DIR)
+    print(f"Schema version {current} (latest {LATEST_VERSION}), {len(pending)} pending.")
+    if args.status or not pending:
+        return
+    applied = run_migrations(
+        app.STORAGE,
+        app.DATA_DIR,
+        lambda values: app._encrypt_fields(values, workers=app.BULK_CRYPTO_WORKERS),
+        chunk_size=max(1, args.chunk_size),
+    )
+    app.STORAGE.flush()
+    print(f"Applied {applied} migration(s); schema is now at version {schema_version(app.DATA_DIR)}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+from __future__ import annotations
+
+import heapq
+import json
+import os
+import threading
+from contextlib import contextmanager
+from bisect import bisect_left, insort
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from json_stream import RecordFilter, decode_json_array, decode_json_array_spans, select
+from user_store import normalize_email
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SNAPSHOT = 0
+JOURNAL = 1
+SEALED = 2
+
+OrderKey = Tuple[str, int]
+Location = Tuple[int, int, int]
+
+
+class OrderJournal:
+    def __init__(
+        self,
+        snapshot_path: Path,
+        journal_path: Path,
+        counter_path: Path,
+        compact_every: int = 1000,
+        index_path: Optional[Path] = None,
+        background_compaction: bool = True,
+    ) -> None:
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.counter_path = counter_path
+        self.index_path = index_path or snapshot_path.with_name(snapshot_path.name + ".idx")
+        self.sealed_path = journal_path.with_name(journal_path.name + ".sealed")
+        self.lock_path = journal_path.with_name(journal_path.name + ".lock")
+        self.compact_lock_path = snapshot_path.with_name(snapshot_path.name + ".compact.lock")
+        self.compact_every = compact_every
+        self.background_compaction = background_compaction
+        self._lock = threading.RLock()
+        self._file_locked = False
+        self._compact_mutex = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._snapshot_last_id = 0
+        self._segment_offsets: Dict[int, int] = {SEALED: 0, JOURNAL: 0}
+        self._segment_inodes: Dict[int, Optional[int]] = {SEALED: None, JOURNAL: None}
+        self._journal_entries = 0
+        self._journal_locations: Dict[int, Tuple[int, int, int, str, OrderKey]] = {}
+        self._journal_by_user: Dict[str, List[OrderKey]] = {}
+        self._last_id = 0
+
+    def _signature(self, path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False) -> Iterator[None]:
+        with self._lock:
+            if self._file_locked:
+                yield
+                return
+            with open(self.lock_path, "ab") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                self._file_locked = True
+                try:
+                    yield
+                finally:
+                    self._file_locked = False
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def _compact_lock(self, blocking: bool) -> Iterator[bool]:
+        if not self._compact_mutex.acquire(blocking):
+            yield False
+            return
+        try:
+            with open(self.compact_lock_path, "ab") as handle:
+                locked = True
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        locked = False
+                try:
+                    yield locked
+                finally:
+                    if locked and fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._compact_mutex.release()
+
+    def _segment_path(self, source: int) -> Path:
+        return {SNAPSHOT: self.snapshot_path, JOURNAL: self.journal_path, SEALED: self.sealed_path}[source]
+
+    def _reset(self) -> None:
+        self._segment_offsets = {SEALED: 0, JOURNAL: 0}
+        self._segment_inodes = {SEALED: None, JOURNAL: None}
+        self._journal_entries = 0
+        self._journal_locations = {}
+        self._journal_by_user = {}
+        self._last_id = self._snapshot_last_id
+
+    @staticmethod
+    def _user_key(order: dict) -> Tuple[str, OrderKey]:
+        return normalize_email(order.get("user_email")), (order.get("created_at", ""), int(order.get("id", 0)))
+
+    def _apply(self, order: dict, source: int, offset: int, length: int) -> None:
+        order_id = int(order.get("id", 0))
+        previous = self._journal_locations.get(order_id)
+        if previous is not None:
+            keys = self._journal_by_user[previous[3]]
+            del keys[bisect_left(keys, previous[4])]
+        email, key = self._user_key(order)
+        insort(self._journal_by_user.setdefault(email, []), key)
+        self._journal_locations[order_id] = (source, offset, length, email, key)
+        self._last_id = max(self._last_id, order_id)
+
+    def _read_counter(self) -> int:
+        try:
+            return int(self.counter_path.read_text(encoding="utf-8").strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_counter(self, value: int) -> None:
+        tmp = self.counter_path.with_name(self.counter_path.name + ".tmp")
+        tmp.write_text(str(value), encoding="utf-8")
+        os.replace(tmp, self.counter_path)
+
+    def _write_index_file(self, path: Path, signature: Tuple[int, int, int], entries: Dict[int, list]) -> int:
+        rows = sorted(entries.values())
+        last_id = max(entries, default=0)
+        with open(path, "wb") as handle:
+            header = {"signature": list(signature), "count": len(rows), "last_id": last_id}
+            handle.write(json.dumps(header).encode("utf-8") + b"\n")
+            for row in rows:
+                handle.write(json.dumps(row, separators=(",", ":")).encode("utf-8") + b"\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        return last_id
+
+    def _write_index(self, signature: Tuple[int, int, int], entries: Dict[int, list]) -> int:
+        tmp = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        last_id = self._write_index_file(tmp, signature, entries)
+        os.replace(tmp, self.index_path)
+        return last_id
+
+    def _build_index(self) -> Optional[dict]:
+        try:
+            handle = open(self.snapshot_path, "r", encoding="utf-8", newline="")
+        except FileNotFoundError:
+            return None
+        with handle:
+            st = os.fstat(handle.fileno())
+            signature = st.st_ino, st.st_mtime_ns, st.st_size
+            entries: Dict[int, list] = {}
+            for offset, length, order in decode_json_array_spans(handle):
+                email, (created_at, order_id) = self._user_key(order)
+                entries[order_id] = [email, created_at, order_id, offset, length]
+        last_id = self._write_index(signature, entries)
+        return {"signature": list(signature), "count": len(entries), "last_id": last_id}
+
+    def _open_index(self) -> Tuple[Optional[BinaryIO], Optional[dict]]:
+        for _ in range(2):
+            try:
+                handle = open(self.index_path, "rb")
+            except FileNotFoundError:
+                handle = None
+            if handle is not None:
+                try:
+                    header = json.loads(handle.readline())
+                except ValueError:
+                    header = None
+                if isinstance(header, dict) and header.get("signature") == list(self._signature(self.snapshot_path) or ()):
+                    return handle, header
+                handle.close()
+            if self._build_index() is None:
+                return None, None
+        return None, None
+
+    def _snapshot_keys(self, email: str) -> List[Tuple[OrderKey, Location]]:
+        handle, _ = self._open_index()
+        if handle is None:
+            return []
+        with handle:
+            lo, hi = handle.tell(), os.fstat(handle.fileno()).st_size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                handle.seek(mid - 1)
+                handle.readline()
+                pos = handle.tell()
+                if pos >= hi:
+                    hi = mid
+                    continue
+                line = handle.readline()
+                if json.loads(line)[0] < email:
+                    lo = pos + len(line)
+                else:
+                    hi = pos
+            handle.seek(lo)
+            keys = []
+            for line in handle:
+                row_email, created_at, order_id, offset, length = json.loads(line)
+                if row_email != email:
+                    break
+                if order_id not in self._journal_locations:
+                    keys.append(((created_at, order_id), (SNAPSHOT, offset, length)))
+            return keys
+
+    def _replay_segments(self) -> bool:
+        for source in (SEALED, JOURNAL):
+            try:
+                handle = open(self._segment_path(source), "rb")
+            except FileNotFoundError:
+                if self._segment_inodes[source] is not None:
+                    return False
+                continue
+            with handle:
+                st = os.fstat(handle.fileno())
+                recorded = self._segment_inodes[source]
+                if (recorded is not None and recorded != st.st_ino) or st.st_size < self._segment_offsets[source]:
+                    return False
+                self._segment_inodes[source] = st.st_ino
+                handle.seek(self._segment_offsets[source])
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset = self._segment_offsets[source]
+                    self._segment_offsets[source] += len(line)
+                    try:
+                        self._apply(json.loads(line), source, offset, len(line) - 1)
+                    except ValueError:
+                        continue
+                    if source == JOURNAL:
+                        self._journal_entries += 1
+        return True
+
+    def _trim_partial_tail(self) -> None:
+        try:
+            handle = open(self.journal_path, "r+b")
+        except FileNotFoundError:
+            return
+        with handle:
+            end = handle.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            handle.seek(end - 1)
+            if handle.read(1) == b"\n":
+                return
+            while end > 0:
+                start = max(end - 65536, 0)
+                handle.seek(start)
+                newline = handle.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            handle.truncate(end)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def refresh(self) -> None:
+        with self._lock:
+            signature = self._signature(self.snapshot_path)
+            if signature != self._snapshot_signature:
+                handle, header = self._open_index()
+                if handle is not None:
+                    handle.close()
+                self._snapshot_signature = signature
+                self._snapshot_last_id = int(header["last_id"]) if header else 0
+                self._reset()
+            while not self._replay_segments():
+                self._reset()
+
+    def load(self) -> List[dict]:
+        return list(self._stream())
+
+    def _journal_records(self, sources: Tuple[int, ...]) -> Dict[int, dict]:
+        records: Dict[int, dict] = {}
+        for source in sources:
+            try:
+                handle = open(self._segment_path(source), "rb")
+            except FileNotFoundError:
+                continue
+            with handle:
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        order = json.loads(line)
+                    except ValueError:
+                        continue
+                    records[int(order.get("id", 0))] = order
+        return records
+
+    def _stream(self, sources: Tuple[int, ...] = (SEALED, JOURNAL)) -> Iterator[dict]:
+        with self._file_lock(shared=True):
+            journal = self._journal_records(sources)
+            snapshot = open(self.snapshot_path, "r", encoding="utf-8") if self.snapshot_path.exists() else None
+        if snapshot is not None:
+            with snapshot:
+                for order in decode_json_array(snapshot):
+                    yield journal.pop(int(order.get("id", 0)), order)
+        yield from journal.values()
+
+    def iter(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        return select(self._stream(), where, fields)
+
+    def _read_records(self, locations: List[Location]) -> List[dict]:
+        handles: Dict[int, BinaryIO] = {}
+        try:
+            records = []
+            for source, offset, length in locations:
+                handle = handles.get(source)
+                if handle is None:
+                    handle = handles[source] = open(self._segment_path(source), "rb")
+                handle.seek(offset)
+                records.append(json.loads(handle.read(length)))
+            return records
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def for_user(self, email: str, limit: int, offset: int = 0) -> Tuple[List[dict], int]:
+        email = normalize_email(email)
+        with self._file_lock(shared=True):
+            self.refresh()
+            journal_keys = [
+                (key, self._journal_locations[key[1]][:3]) for key in self._journal_by_user.get(email, [])
+            ]
+            keys = list(heapq.merge(self._snapshot_keys(email), journal_keys))
+            end = max(len(keys) - offset, 0)
+            page = keys[max(end - limit, 0):end]
+            return self._read_records([location for _, location in reversed(page)]), len(keys)
+
+    def next_id(self) -> int:
+        with self._file_lock(shared=True):
+            self.refresh()
+            return max(self._last_id, self._read_counter()) + 1
+
+    def append(self, order: dict) -> dict:
+        with self._file_lock():
+            self._trim_partial_tail()
+            self.refresh()
+            record = dict(order)
+            record["id"] = max(self._last_id, self._read_counter()) + 1
+            line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            with open(self.journal_path, "ab") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._write_counter(record["id"])
+            self.refresh()
+            self._seal_if_due()
+        self._start_compaction()
+        return dict(record)
+
+    def replace(self, orders: List[dict]) -> None:
+        if not orders:
+            return
+        with self._file_lock():
+            self._trim_partial_tail()
+            self.refresh()
+            lines = [
+                json.dumps(dict(o), separators=(",", ":")).encode("utf-8") + b"\n"
+                for o in orders
+                if 0 < int(o.get("id", 0)) <= self._last_id
+            ]
+            with open(self.journal_path, "ab") as handle:
+                handle.write(b"".join(lines))
+                handle.flush()
+                os.fsync(handle.fileno())
+            self.refresh()
+            self._seal_if_due()
+        self._start_compaction()
+
+    def _seal_if_due(self) -> None:
+        if self._journal_entries >= self.compact_every and not self.sealed_path.exists():
+            os.replace(self.journal_path, self.sealed_path)
+            self.refresh()
+
+    def _start_compaction(self) -> None:
+        if not self.sealed_path.exists():
+            return
+        if not self.background_compaction:
+            self._compact_sealed()
+            return
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self._compact_sealed, name="order-compactor", daemon=True)
+            self._compactor.start()
+
+    def _compact_sealed(self) -> None:
+        with self._compact_lock(blocking=False) as acquired:
+            if not acquired or not self.sealed_path.exists():
+                return
+            snapshot_tmp, index_tmp = self._build_snapshot(self._stream((SEALED,)))
+            with self._file_lock():
+                os.replace(snapshot_tmp, self.snapshot_path)
+                os.replace(index_tmp, self.index_path)
+                self.sealed_path.unlink()
+
+    def _build_snapshot(self, orders: Iterable[dict]) -> Tuple[Path, Path]:
+        snapshot_tmp = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        index_tmp = self.index_path.with_name(self.index_path.name + ".compact.tmp")
+        entries: Dict[int, list] = {}
+        with open(snapshot_tmp, "wb") as handle:
+            handle.write(b"[")
+            offset = 1
+            separator = b"\n"
+            for order in orders:
+                body = json.dumps(order, separators=(",", ":")).encode("utf-8")
+                handle.write(separator + body)
+                offset += len(separator)
+                email, (created_at, order_id) = self._user_key(order)
+                entries[order_id] = [email, created_at, order_id, offset, len(body)]
+                offset += len(body)
+                separator = b",\n"
+            handle.write(b"\n]\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+            st = os.fstat(handle.fileno())
+        self._write_index_file(index_tmp, (st.st_ino, st.st_mtime_ns, st.st_size), entries)
+        return snapshot_tmp, index_tmp
+
+    def _compact_all(self, orders: Optional[Iterable[dict]] = None) -> None:
+        with self._compact_lock(blocking=True), self._file_lock():
+            self._trim_partial_tail()
+            self.refresh()
+            last_id = max(self._last_id, self._read_counter())
+            snapshot_tmp, index_tmp = self._build_snapshot(self._stream() if orders is None else orders)
+            os.replace(snapshot_tmp, self.snapshot_path)
+            os.replace(index_tmp, self.index_path)
+            self.sealed_path.unlink(missing_ok=True)
+            with open(self.journal_path, "wb") as handle:
+                os.fsync(handle.fileno())
+            self.refresh()
+            self._write_counter(max(last_id, self._last_id))
+
+    def compact(self) -> None:
+        self._compact_all()
+
+    def save(self, orders: List[dict]) -> None:
+        self._compact_all([dict(o) for o in orders])
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ALGORITHM = "pbkdf2_sha256"
+DEFAULT_ITERATIONS = 310000
+MIN_ITERATIONS = 100000
+SALT_BYTES = 16
+PROBE_ITERATIONS = 50000
+
+
+def default_policy() -> dict:
+    return {"algorithm": ALGORITHM, "iterations": DEFAULT_ITERATIONS}
+
+
+def load_policy(path: Path) -> dict:
+    policy = default_policy()
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return policy
+    if data.get("algorithm") == ALGORITHM and int(data.get("iterations", 0)) >= MIN_ITERATIONS:
+        policy.update(data)
+    return policy
+
+
+def save_policy(path: Path, policy: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(policy, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def hash_password_with_cost(password: str, iterations: int) -> dict:
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return {
+        "algorithm": ALGORITHM,
+        "iterations": iterations,
+        "salt": base64.b64encode(salt).decode("ascii"),
+        "hash": base64.b64encode(digest).decode("ascii"),
+    }
+
+
+def needs_rehash(password_data: dict, policy: dict) -> bool:
+    if password_data.get("algorithm") != policy["algorithm"]:
+        return True
+    try:
+        return int(password_data.get("iterations", 0)) != int(policy["iterations"])
+    except (TypeError, ValueError):
+        return True
+
+
+def _time_pbkdf2(iterations: int) -> float:
+    salt = os.urandom(SALT_BYTES)
+    started = time.perf_counter()
+    hashlib.pbkdf2_hmac("sha256", b"calibration-password", salt, iterations)
+    return time.perf_counter() - started
+
+
+def calibrate(target_ms: float, rounds: int = 5) -> int:
+    per_iteration = statistics.median(_time_pbkdf2(PROBE_ITERATIONS) for _ in range(rounds)) / PROBE_ITERATIONS
+    iterations = int(target_ms / 1000 / per_iteration)
+    iterations = max(MIN_ITERATIONS, iterations // 10000 * 10000)
+
+    measured_ms = statistics.median(_time_pbkdf2(iterations) for _ in range(rounds)) * 1000
+    if measured_ms > target_ms * 1.1:
+        iterations = max(MIN_ITERATIONS, int(iterations * target_ms / measured_ms) // 10000 * 10000)
+    return iterations
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Pick PBKDF2 iterations for a target password verify time on this host.")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--policy-path", type=Path, default=Path(__file__).resolve().parent / "data" / "password_policy.json")
+    parser.add_argument("--write", action="store_true", help="save the result as the active password policy")
+    args = parser.parse_args(argv)
+
+    iterations = calibrate(args.target_ms, args.rounds)
+    measured_ms = statistics.median(_time_pbkdf2(iterations) for _ in range(args.rounds)) * 1000
+    policy = {
+        "algorithm": ALGORITHM,
+        "iterations": iterations,
+        "target_ms": args.target_ms,
+        "measured_ms": round(measured_ms, 1),
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print(f"{ALGORITHM}: {iterations} iterations (~{measured_ms:.0f} ms, target {args.target_ms:.0f} ms)")
+    if args.write:
+        save_policy(args.policy_path, policy)
+        print(f"Saved policy to {args.policy_path}")
+
+
+if __name__ == "__main__":
+    main()
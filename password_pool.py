@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from encryption import verify_password
+from password_cost import hash_password_with_cost
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, workers: int, max_pending: int, timeout_seconds: float) -> None:
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolBusy("Password hashing queue is full.")
+        if self.workers <= 0:
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset_executor()
+            raise PasswordPoolBusy("Password hashing workers are restarting.") from None
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordPoolBusy("Password hashing timed out.") from None
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise PasswordPoolBusy("Password hashing workers are restarting.") from None
+
+    def hash(self, password: str, iterations: int) -> dict:
+        return self._run(hash_password_with_cost, password, iterations)
+
+    def verify(self, password: str, password_data: dict) -> bool:
+        return bool(self._run(verify_password, password, password_data))
+
+    def shutdown(self) -> None:
+        self._reset_executor()
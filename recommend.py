@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import List, Sequence
+
+CATEGORY_WEIGHT = 4.0
+CITY_WEIGHT = 2.0
+DATE_WEIGHT = 1.0
+PRICE_WEIGHT = 1.0
+DATE_SCALE_SECONDS = 30 * 86400.0
+CANDIDATE_WINDOW = 32
+TOP_K = 8
+
+
+def _score(same_category: bool, same_city: bool, seconds_apart: float, price_a: float, price_b: float) -> float:
+    score = CATEGORY_WEIGHT if same_category else 0.0
+    if same_city:
+        score += CITY_WEIGHT
+    score += DATE_WEIGHT / (1.0 + seconds_apart / DATE_SCALE_SECONDS)
+    low, high = (price_a, price_b) if price_a <= price_b else (price_b, price_a)
+    return score + PRICE_WEIGHT * (low + 1.0) / (high + 1.0)
+
+
+def _window(positions: Sequence[int], pos: int, size: int) -> Sequence[int]:
+    i = bisect_left(positions, pos)
+    return positions[max(i - size, 0):i + size + 1]
+
+
+def neighbors_of(
+    pos: int,
+    category_codes: Sequence[int],
+    city_codes: Sequence[int],
+    starts: Sequence[int],
+    prices: Sequence[float],
+    category_rows: Sequence[Sequence[int]],
+    city_rows: Sequence[Sequence[int]],
+    k: int = TOP_K,
+    window: int = CANDIDATE_WINDOW,
+) -> List[int]:
+    category, city, start, price = category_codes[pos], city_codes[pos], starts[pos], max(prices[pos], 0.0)
+    candidates = set(_window(category_rows[category], pos, window))
+    candidates.update(_window(city_rows[city], pos, window))
+    if len(candidates) <= k:
+        candidates.update(range(max(pos - window, 0), min(pos + window + 1, len(starts))))
+    candidates.discard(pos)
+    scored = [
+        (
+            _score(category_codes[o] == category, city_codes[o] == city, abs(starts[o] - start), price, max(prices[o], 0.0)),
+            -o,
+        )
+        for o in candidates
+    ]
+    return [-neg_row for _, neg_row in heapq.nlargest(k, scored)]
+
+
+def build_neighbors(
+    category_codes: Sequence[int],
+    city_codes: Sequence[int],
+    starts: Sequence[int],
+    prices: Sequence[float],
+    category_rows: Sequence[Sequence[int]],
+    city_rows: Sequence[Sequence[int]],
+    k: int = TOP_K,
+    window: int = CANDIDATE_WINDOW,
+) -> array:
+    size = len(starts)
+    neighbors = array("q", [-1]) * (size * k)
+    for pos in range(size):
+        ranked = neighbors_of(pos, category_codes, city_codes, starts, prices, category_rows, city_rows, k, window)
+        neighbors[pos * k:pos * k + len(ranked)] = array("q", ranked)
+    return neighbors
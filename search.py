@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    from catalog import Event
+
+TOKEN_RE = re.compile(r"\w+")
+FIELD_WEIGHTS = (("title", 3.0), ("venue", 2.0), ("description", 1.0))
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def _event_terms(event: Event) -> Dict[str, float]:
+    terms: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(event, field)):
+            terms[token] = terms.get(token, 0.0) + weight
+    return terms
+
+
+def _fingerprint(event: Event) -> tuple:
+    return tuple(getattr(event, field) for field, _ in FIELD_WEIGHTS)
+
+
+class SearchIndex:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocabulary: List[str] = []
+        self._docs: Dict[int, tuple] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, event: Event) -> None:
+        with self._lock:
+            if event.id in self._docs:
+                self.remove(event.id)
+            terms = _event_terms(event)
+            for term, weight in terms.items():
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = self._postings[term] = {}
+                    insort(self._vocabulary, term)
+                posting[event.id] = weight
+            self._docs[event.id] = _fingerprint(event)
+            self._doc_terms[event.id] = terms
+
+    def remove(self, event_id: int) -> None:
+        with self._lock:
+            self._docs.pop(event_id, None)
+            for term in self._doc_terms.pop(event_id, {}):
+                posting = self._postings[term]
+                posting.pop(event_id, None)
+                if not posting:
+                    del self._postings[term]
+                    del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+    def sync(self, events: Iterable[Event]) -> None:
+        with self._lock:
+            current = {e.id: e for e in events}
+            for event_id in [i for i in self._docs if i not in current]:
+                self.remove(event_id)
+            for event_id, event in current.items():
+                if self._docs.get(event_id) != _fingerprint(event):
+                    self.add(event)
+
+    def _token_scores(self, token: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        vocabulary = self._vocabulary
+        k = bisect_left(vocabulary, token)
+        while k < len(vocabulary) and vocabulary[k].startswith(token):
+            term = vocabulary[k]
+            factor = 1.0 if term == token else PREFIX_FACTOR
+            for event_id, weight in self._postings[term].items():
+                score = weight * factor
+                if score > scores.get(event_id, 0.0):
+                    scores[event_id] = score
+            k += 1
+        return scores
+
+    def search(self, query: str) -> Dict[int, float]:
+        tokens = sorted(set(tokenize(query)))
+        if not tokens:
+            return {}
+        with self._lock:
+            per_token = [self._token_scores(token) for token in tokens]
+        per_token.sort(key=len)
+        results = dict(per_token[0])
+        for scores in per_token[1:]:
+            results = {i: s + scores[i] for i, s in results.items() if i in scores}
+            if not results:
+                break
+        return results
@@ -0,0 +1,476 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from json_stream import RecordFilter, select
+from order_journal import OrderJournal
+from user_store import UserStore, normalize_email
+
+EVENT_COLUMNS = (
+    "id",
+    "title",
+    "category",
+    "city",
+    "venue",
+    "start",
+    "end",
+    "price_usd",
+    "available_tickets",
+    "banner_url",
+    "description",
+)
+
+
+class Storage(ABC):
+    name = ""
+
+    @abstractmethod
+    def events_signature(self) -> Optional[tuple]:
+        ...
+
+    @abstractmethod
+    def events_modified_at(self) -> Optional[datetime]:
+        ...
+
+    @abstractmethod
+    def load_event_rows(self) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def save_event_rows(self, rows: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def load_users(self) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def save_users(self, users: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def iter_users(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        ...
+
+    @abstractmethod
+    def find_user_by_email(self, email: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def find_user_by_id(self, user_id: int) -> Optional[dict]:
+        ...
+
+    def user_email_exists(self, email: str) -> bool:
+        return self.find_user_by_email(email) is not None
+
+    @abstractmethod
+    def next_user_id(self) -> int:
+        ...
+
+    @abstractmethod
+    def append_user(self, user: dict) -> None:
+        ...
+
+    @abstractmethod
+    def update_user(self, email: str, changes: dict, remove: Iterable[str] = ()) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def load_orders(self) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def save_orders(self, orders: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def iter_orders(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        ...
+
+    @abstractmethod
+    def append_order(self, order: dict) -> dict:
+        ...
+
+    @abstractmethod
+    def replace_orders(self, orders: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def orders_for_user(self, email: str, limit: int, offset: int = 0) -> Tuple[List[dict], int]:
+        ...
+
+    def compact_orders(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+
+class JsonStorage(Storage):
+    name = "json"
+
+    def __init__(self, data_dir: Path, compact_every: int = 1000, users_flush_delay: float = 0.0) -> None:
+        self.events_path = data_dir / "events.json"
+        self.users = UserStore(data_dir / "users.json", flush_delay=users_flush_delay)
+        self.orders = OrderJournal(
+            data_dir / "orders.json",
+            data_dir / "orders.journal.jsonl",
+            data_dir / "orders.seq",
+            compact_every=compact_every,
+        )
+
+    def events_signature(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.events_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def events_modified_at(self) -> Optional[datetime]:
+        try:
+            return datetime.fromtimestamp(int(os.stat(self.events_path).st_mtime), timezone.utc)
+        except FileNotFoundError:
+            return None
+
+    def load_event_rows(self) -> List[dict]:
+        if not self.events_path.exists():
+            return []
+        return json.loads(self.events_path.read_text(encoding="utf-8"))
+
+    def save_event_rows(self, rows: List[dict]) -> None:
+        self.events_path.write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+    def load_users(self) -> List[dict]:
+        return self.users.all()
+
+    def save_users(self, users: List[dict]) -> None:
+        self.users.save(users)
+
+    def iter_users(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        return self.users.iter(where, fields)
+
+    def find_user_by_email(self, email: str) -> Optional[dict]:
+        return self.users.find_by_email(email)
+
+    def find_user_by_id(self, user_id: int) -> Optional[dict]:
+        return self.users.find_by_id(user_id)
+
+    def user_email_exists(self, email: str) -> bool:
+        return self.users.email_exists(email)
+
+    def next_user_id(self) -> int:
+        return self.users.next_id()
+
+    def append_user(self, user: dict) -> None:
+        self.users.append(user)
+
+    def update_user(self, email: str, changes: dict, remove: Iterable[str] = ()) -> Optional[dict]:
+        return self.users.update(email, changes, remove)
+
+    def load_orders(self) -> List[dict]:
+        return self.orders.load()
+
+    def save_orders(self, orders: List[dict]) -> None:
+        self.orders.save(orders)
+
+    def iter_orders(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        return self.orders.iter(where, fields)
+
+    def append_order(self, order: dict) -> dict:
+        return self.orders.append(order)
+
+    def replace_orders(self, orders: List[dict]) -> None:
+        self.orders.replace(orders)
+
+    def orders_for_user(self, email: str, limit: int, offset: int = 0) -> Tuple[List[dict], int]:
+        return self.orders.for_user(email, limit, offset)
+
+    def compact_orders(self) -> None:
+        self.orders.compact()
+
+    def flush(self) -> None:
+        self.users.flush()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    city TEXT NOT NULL,
+    venue TEXT NOT NULL,
+    start TEXT NOT NULL,
+    "end" TEXT NOT NULL,
+    price_usd REAL NOT NULL,
+    available_tickets INTEGER NOT NULL,
+    banner_url TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_events_start ON events (start);
+CREATE INDEX IF NOT EXISTS idx_events_category ON events (category);
+CREATE INDEX IF NOT EXISTS idx_events_city ON events (city);
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_email TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user_email ON orders (user_email, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_event_id ON orders (event_id);
+"""
+
+
+class SqliteStorage(Storage):
+    name = "sqlite"
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connect().executescript(SQLITE_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _stream_data(self, table: str) -> Iterator[dict]:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            for (data,) in conn.execute(f"SELECT data FROM {table} ORDER BY id"):
+                yield json.loads(data)
+        finally:
+            conn.close()
+
+    def _write(self, statements) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            statements(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def events_signature(self) -> Optional[tuple]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'events_revision'").fetchone()
+        return (row["value"],) if row else (0,)
+
+    def events_modified_at(self) -> Optional[datetime]:
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'events_modified_at'").fetchone()
+        return datetime.fromtimestamp(row["value"], timezone.utc) if row else None
+
+    def load_event_rows(self) -> List[dict]:
+        rows = self._connect().execute("SELECT * FROM events ORDER BY id").fetchall()
+        return [{k: row[k] for k in EVENT_COLUMNS} for row in rows]
+
+    def save_event_rows(self, rows: List[dict]) -> None:
+        def statements(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM events")
+            conn.executemany(
+                'INSERT INTO events (id, title, category, city, venue, start, "end", price_usd, available_tickets, banner_url, description) '
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(e["id"]), e["title"], e["category"], e["city"], e["venue"], e["start"], e["end"],
+                        float(e["price_usd"]), int(e["available_tickets"]), e.get("banner_url", ""), e.get("description", ""),
+                    )
+                    for e in rows
+                ],
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('events_revision', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('events_modified_at', CAST(strftime('%s', 'now') AS INTEGER)) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+            )
+        self._write(statements)
+
+    def load_users(self) -> List[dict]:
+        rows = self._connect().execute("SELECT data FROM users ORDER BY id").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def save_users(self, users: List[dict]) -> None:
+        def statements(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM users")
+            conn.executemany(
+                "INSERT INTO users (id, email, data) VALUES (?, ?, ?)",
+                [(int(u.get("id", 0)), normalize_email(u.get("email")), json.dumps(u)) for u in users],
+            )
+        self._write(statements)
+
+    def iter_users(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        return select(self._stream_data("users"), where, fields)
+
+    def find_user_by_email(self, email: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT data FROM users WHERE email = ? ORDER BY id LIMIT 1", (normalize_email(email),)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def find_user_by_id(self, user_id: int) -> Optional[dict]:
+        row = self._connect().execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def next_user_id(self) -> int:
+        row = self._connect().execute("SELECT COALESCE(MAX(id), 0) + 1 AS next_id FROM users").fetchone()
+        return int(row["next_id"])
+
+    def append_user(self, user: dict) -> None:
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO users (id, email, data) VALUES (?, ?, ?)",
+            (int(user.get("id", 0)), normalize_email(user.get("email")), json.dumps(user)),
+        ))
+
+    def update_user(self, email: str, changes: dict, remove: Iterable[str] = ()) -> Optional[dict]:
+        updated: List[dict] = []
+
+        def statements(conn: sqlite3.Connection) -> None:
+            row = conn.execute(
+                "SELECT id, data FROM users WHERE email = ? ORDER BY id LIMIT 1", (normalize_email(email),)
+            ).fetchone()
+            if row is None:
+                return
+            record = json.loads(row["data"])
+            for key in remove:
+                record.pop(key, None)
+            record.update(changes)
+            conn.execute("UPDATE users SET data = ? WHERE id = ?", (json.dumps(record), row["id"]))
+            updated.append(record)
+
+        self._write(statements)
+        return updated[0] if updated else None
+
+    def load_orders(self) -> List[dict]:
+        rows = self._connect().execute("SELECT data FROM orders ORDER BY id").fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def iter_orders(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        return select(self._stream_data("orders"), where, fields)
+
+    def save_orders(self, orders: List[dict]) -> None:
+        def statements(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM orders")
+            conn.executemany(
+                "INSERT INTO orders (id, user_email, event_id, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(o.get("id", 0)), normalize_email(o.get("user_email")), int(o.get("event_id", 0)),
+                        o.get("created_at", ""), json.dumps(o),
+                    )
+                    for o in orders
+                ],
+            )
+        self._write(statements)
+
+    def append_order(self, order: dict) -> dict:
+        record = dict(order)
+
+        def statements(conn: sqlite3.Connection) -> None:
+            cur = conn.execute(
+                "INSERT INTO orders (user_email, event_id, created_at, data) VALUES (?, ?, ?, '')",
+                (normalize_email(record.get("user_email")), int(record.get("event_id", 0)), record.get("created_at", "")),
+            )
+            record["id"] = cur.lastrowid
+            conn.execute("UPDATE orders SET data = ? WHERE id = ?", (json.dumps(record), record["id"]))
+
+        self._write(statements)
+        return dict(record)
+
+    def replace_orders(self, orders: List[dict]) -> None:
+        self._write(lambda conn: conn.executemany(
+            "UPDATE orders SET user_email = ?, event_id = ?, created_at = ?, data = ? WHERE id = ?",
+            [
+                (
+                    normalize_email(o.get("user_email")), int(o.get("event_id", 0)), o.get("created_at", ""),
+                    json.dumps(o), int(o.get("id", 0)),
+                )
+                for o in orders
+            ],
+        ))
+
+    def orders_for_user(self, email: str, limit: int, offset: int = 0) -> Tuple[List[dict], int]:
+        conn = self._connect()
+        email_norm = normalize_email(email)
+        rows = conn.execute(
+            "SELECT data FROM orders WHERE user_email = ? ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (email_norm, limit, offset),
+        ).fetchall()
+        total = conn.execute("SELECT COUNT(*) FROM orders WHERE user_email = ?", (email_norm,)).fetchone()[0]
+        return [json.loads(row["data"]) for row in rows], total
+
+    def compact_orders(self) -> None:
+        conn = self._connect()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def open_storage(
+    kind: str,
+    data_dir: Path,
+    sqlite_path: Optional[Path] = None,
+    compact_every: int = 1000,
+    users_flush_delay: float = 0.0,
+) -> Storage:
+    kind = (kind or "json").strip().lower()
+    if kind == "json":
+        return JsonStorage(data_dir, compact_every=compact_every, users_flush_delay=users_flush_delay)
+    if kind == "sqlite":
+        return SqliteStorage(sqlite_path or data_dir / "eventhub.db")
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+
+def migrate_storage(source: Storage, target: Storage) -> dict:
+    events = source.load_event_rows()
+    users = source.load_users()
+    orders = source.load_orders()
+    target.save_event_rows(events)
+    target.save_users(users)
+    target.save_orders(orders)
+    return {"events": len(events), "users": len(users), "orders": len(orders)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Copy EventHub data between storage backends.")
+    parser.add_argument("--from", dest="source", choices=("json", "sqlite"), required=True)
+    parser.add_argument("--to", dest="target", choices=("json", "sqlite"), required=True)
+    parser.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parent / "data")
+    parser.add_argument("--sqlite-path", type=Path, default=None)
+    args = parser.parse_args(argv)
+    if args.source == args.target:
+        parser.error("--from and --to must be different backends")
+
+    source = open_storage(args.source, args.data_dir, args.sqlite_path)
+    target = open_storage(args.target, args.data_dir, args.sqlite_path)
+    counts = migrate_storage(source, target)
+    print(f"Migrated {counts['events']} events, {counts['users']} users and {counts['orders']} orders "
+          f"from {source.name} to {target.name}.")
+
+
+if __name__ == "__main__":
+    main()
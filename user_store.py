@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from json_stream import RecordFilter, iter_json_array, select
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_REMOVED = object()
+
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+class UserStore:
+    def __init__(self, path: Path, flush_delay: float = 0.0) -> None:
+        self.path = path
+        self.lock_path = path.with_name(path.name + ".lock")
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._pending: Dict[int, dict] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self._records: List[dict] = []
+        self._by_email: Dict[str, int] = {}
+        self._by_id: Dict[int, int] = {}
+        self._max_id = 0
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        with self._lock:
+            with open(self.lock_path, "ab") as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _index(self, records: List[dict]) -> None:
+        by_email: Dict[str, int] = {}
+        by_id: Dict[int, int] = {}
+        for pos, u in enumerate(records):
+            by_email.setdefault(normalize_email(u.get("email")), pos)
+            by_id.setdefault(int(u.get("id", 0)), pos)
+        self._records = records
+        self._by_email = by_email
+        self._by_id = by_id
+        self._max_id = max(by_id, default=0)
+
+    def _load(self) -> None:
+        signature = self._stat_signature()
+        records = json.loads(self.path.read_text(encoding="utf-8")) if signature else []
+        self._index(records)
+        for user_id, changes in self._pending.items():
+            pos = self._by_id.get(user_id)
+            if pos is not None:
+                self._records[pos] = _apply_changes(self._records[pos], changes)
+        self._signature = signature
+        self._loaded = True
+
+    def refresh(self, force: bool = False) -> None:
+        signature = self._stat_signature()
+        if not force and self._loaded and signature == self._signature:
+            return
+        with self._lock:
+            signature = self._stat_signature()
+            if not force and self._loaded and signature == self._signature:
+                return
+            self._load()
+
+    def _write(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self._records, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._signature = self._stat_signature()
+
+    def _flush_locked(self, added: Optional[dict] = None) -> None:
+        self._load()
+        self._pending.clear()
+        if added is not None:
+            if added["id"] in self._by_id or added["id"] <= 0:
+                added["id"] = self._max_id + 1
+            self._records.append(added)
+            self._index(self._records)
+        self._write()
+
+    def _mark_dirty(self, user_id: int, changes: dict, remove: Iterable[str]) -> None:
+        pending = self._pending.setdefault(user_id, {})
+        for key in remove:
+            pending[key] = _REMOVED
+        pending.update(changes)
+        if self.flush_delay <= 0:
+            self.flush()
+            return
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        with self._file_lock():
+            timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if self._pending:
+                self._flush_locked()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def all(self) -> List[dict]:
+        self.refresh()
+        return [dict(u) for u in self._records]
+
+    def iter(self, where: RecordFilter = None, fields: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        self.flush()
+        return select(iter_json_array(self.path), where, fields)
+
+    def find_by_email(self, email: str) -> Optional[dict]:
+        self.refresh()
+        pos = self._by_email.get(normalize_email(email))
+        return None if pos is None else dict(self._records[pos])
+
+    def find_by_id(self, user_id: int) -> Optional[dict]:
+        self.refresh()
+        pos = self._by_id.get(user_id)
+        return None if pos is None else dict(self._records[pos])
+
+    def email_exists(self, email: str) -> bool:
+        self.refresh()
+        return normalize_email(email) in self._by_email
+
+    def next_id(self) -> int:
+        self.refresh()
+        return self._max_id + 1
+
+    def save(self, users: List[dict]) -> None:
+        with self._file_lock():
+            timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            self._pending.clear()
+            self._index([dict(u) for u in users])
+            self._write()
+            self._loaded = True
+
+    def append(self, user: dict) -> dict:
+        record = dict(user)
+        record["id"] = int(record.get("id", 0))
+        with self._file_lock():
+            self._flush_locked(added=record)
+        return dict(record)
+
+    def update(self, email: str, changes: dict, remove: Iterable[str] = ()) -> Optional[dict]:
+        with self._lock:
+            self.refresh()
+            pos = self._by_email.get(normalize_email(email))
+            if pos is None:
+                return None
+            current = self._records[pos]
+            record = dict(current)
+            for key in remove:
+                record.pop(key, None)
+            record.update(changes)
+            if record != current:
+                self._records[pos] = record
+                self._mark_dirty(int(current.get("id", 0)), changes, remove)
+            return dict(record)
+
+
+def _apply_changes(record: dict, changes: dict) -> dict:
+    record = dict(record)
+    for key, value in changes.items():
+        if value is _REMOVED:
+            record.pop(key, None)
+        else:
+            record[key] = value
+    return record